@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import deque
+
+import pyttsx3
+
+
+class Announcer:
+    """
+    Speaks gate announcements on a dedicated thread so the video loop never
+    waits on pyttsx3. At most max_pending messages are queued (the oldest is
+    dropped when full), a message identical to one already pending is
+    coalesced, and messages older than max_age seconds are skipped unspoken.
+    """
+
+    def __init__(self, max_pending=3, max_age=5.0):
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.dropped = 0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="announcer", daemon=True)
+        self._thread.start()
+
+    def say(self, text):
+        with self._cond:
+            if any(t == text for t, _ in self._pending):
+                return
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((text, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """
+        Finish speaking what is still pending (and fresh), then stop the worker.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        # pyttsx3 engines must be driven from the thread that created them
+        try:
+            engine = pyttsx3.init()
+        except Exception as e:
+            print("Speech unavailable:", e)
+            engine = None
+
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                text, queued_at = self._pending.popleft()
+
+            if time.monotonic() - queued_at > self.max_age:
+                self.dropped += 1
+                continue
+            if engine is None:
+                continue
+            try:
+                engine.say(text)
+                engine.runAndWait()
+            except Exception:
+                pass
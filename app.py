@@ -14,9 +14,10 @@ import os
 import base64
 
 from detector import PlateDetector
+from frame_capture import LatestFrameCapture
 from vehicle_detector import VehicleDetector
 from ocr_reader import LPROCR
-from parking_logic import handle_entry, handle_exit
+from parking_logic import db, handle_entry, handle_exit
 from normalize_plate import normalize_plate
 from utils import draw_plate_box
 from vehicle_map import VEHICLE_CLASSES
@@ -46,6 +47,9 @@ st.write("Use camera or upload image. Entry / Exit flow with invoice download.")
 page = st.sidebar.radio("Mode", ["Entry Gate", "Exit Gate"])
 st.sidebar.markdown("---")
 st.sidebar.info("Capture a photo with your webcam (Use *Take photo*), or upload an image file.")
+st.sidebar.markdown("**Free slots**")
+for slot_type, counts in db.get_occupancy().items():
+    st.sidebar.write(f"{slot_type.upper()}: {counts['free']} / {counts['total']}")
 
 
 if "last_plate_time" not in st.session_state:
@@ -62,6 +66,28 @@ def capture_from_camera():
     frame = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
     return frame
 
+@st.cache_resource
+def open_stream(source):
+    """One background capture per stream source, shared across reruns."""
+    return LatestFrameCapture(source, buffer_size=1, drop=True)
+
+def capture_from_stream():
+    """Newest frame of an RTSP / file / webcam-index source (None until one arrives)."""
+    source = st.text_input("Stream source (RTSP URL, video file or webcam index)")
+    if not source:
+        return None
+    cap = open_stream(source.strip())
+    if not cap.isOpened():
+        st.warning(f"Cannot open stream: {source}")
+        return None
+    st.button("Grab latest frame")
+    latest = cap.latest()
+    if latest is None:
+        return None
+    stats = cap.stats()
+    st.caption(f"Frame {latest.idx}, {stats['age_ms']} ms old, {stats['decoded']} decoded")
+    return latest.image.copy()
+
 def load_image(uploaded_img):
     file_bytes = np.frombuffer(uploaded_img.read(), np.uint8)
     return cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
@@ -142,11 +168,14 @@ col1, col2 = st.columns([1, 1])
 with col1:
     st.subheader("Input")
     use_camera = st.checkbox("Use Camera (take photo)", value=False)
+    use_stream = st.checkbox("Use live stream", value=False)
     uploaded_img = None
     frame = None
 
     if use_camera:
         frame = capture_from_camera()
+    elif use_stream:
+        frame = capture_from_stream()
     else:
         uploaded_img = st.file_uploader("Upload image", type=["jpg", "jpeg", "png"])
         if uploaded_img:
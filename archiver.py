@@ -0,0 +1,51 @@
+import threading
+
+
+class Archiver:
+    """
+    Background thread that moves closed sessions out of the hot parking table
+    via Database.archive_closed(). Runs every interval seconds and/or as soon
+    as every sessions have been closed since the last run.
+    """
+
+    def __init__(self, db, every=None, interval=None, batch_size=1000):
+        self.db = db
+        self.every = every
+        self.interval = interval
+        self.batch_size = batch_size
+        self._closed = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="db-archiver", daemon=True)
+        self._thread.start()
+
+    def notify_closed(self, n=1):
+        if not self.every:
+            return
+        with self._lock:
+            self._closed += n
+            due = self._closed >= self.every
+        if due:
+            self._wake.set()
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop:
+                return
+            with self._lock:
+                self._closed = 0
+            try:
+                moved = self.db.archive_closed(self.batch_size)
+            except Exception as e:
+                print("Archiver error:", e)
+                continue
+            if moved:
+                print(f"Archived {moved} closed parking sessions.")
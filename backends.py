@@ -0,0 +1,134 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+
+BACKENDS = ("torch", "onnx", "openvino")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def artifact_path(model_path, backend, int8=False):
+    """
+    Where the exported model for backend lives: next to the .pt weights, named
+    the way ultralytics' exporter names them (ONNX INT8 gets an _int8 suffix).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}")
+    stem = os.path.splitext(model_path)[0]
+    if backend == "torch":
+        return model_path
+    if backend == "onnx":
+        return stem + ("_int8.onnx" if int8 else ".onnx")
+    return stem + ("_int8_openvino_model" if int8 else "_openvino_model")
+
+
+def load_model(model_path, backend="torch", int8=False, calibration=None, imgsz=640):
+    """
+    YOLO model for the chosen backend. ONNX/OpenVINO models are exported from
+    model_path on first use and reused afterwards; every backend goes through
+    ultralytics' own predictor, so results decode exactly like the .pt model.
+
+    calibration: dataset yaml (same layout as data.yaml) whose val images
+    calibrate INT8 quantization; required when int8 is set.
+    """
+    path = ensure_exported(model_path, backend, int8=int8, calibration=calibration, imgsz=imgsz)
+    if backend == "torch":
+        return YOLO(model_path)
+    return YOLO(path, task="detect")
+
+
+def ensure_exported(model_path, backend, int8=False, calibration=None, imgsz=640):
+    """
+    artifact_path() for backend, exporting it first if it is not cached yet.
+    Does not load the model.
+    """
+    if backend == "torch":
+        if int8:
+            raise ValueError("int8 needs the onnx or openvino backend")
+        return model_path
+    path = artifact_path(model_path, backend, int8)
+    if not os.path.exists(path):
+        export_model(model_path, backend, int8=int8, calibration=calibration, imgsz=imgsz)
+    return path
+
+
+def export_model(model_path, backend, int8=False, calibration=None, imgsz=640):
+    """
+    Export model_path for backend to artifact_path(); returns that path.
+    """
+    if int8 and not calibration:
+        raise ValueError("int8 export needs a calibration dataset yaml")
+    path = artifact_path(model_path, backend, int8)
+    model = YOLO(model_path)
+
+    if backend == "openvino":
+        # dynamic shapes keep batched, rect-letterboxed inference identical to the .pt model
+        kwargs = {"int8": True, "data": calibration} if int8 else {}
+        exported = model.export(format="openvino", imgsz=imgsz, dynamic=True, **kwargs)
+    else:
+        fp32 = artifact_path(model_path, "onnx")
+        exported = fp32 if os.path.exists(fp32) else model.export(format="onnx", imgsz=imgsz, dynamic=True)
+        if int8:
+            exported = _quantize_onnx(exported, path, _calibration_images(calibration), imgsz)
+
+    exported = str(exported).rstrip(os.sep)
+    if os.path.abspath(exported) != os.path.abspath(path):
+        os.replace(exported, path)
+    return path
+
+
+def _calibration_images(data_yaml, split="val"):
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    root = data.get(split) or data.get("train")
+    if not os.path.isabs(root):
+        root = os.path.join(data.get("path") or os.path.dirname(os.path.abspath(data_yaml)), root)
+    files = [p for p in glob.glob(os.path.join(root, "**", "*"), recursive=True)
+             if p.lower().endswith(IMAGE_EXTS)]
+    if not files:
+        raise ValueError(f"no calibration images under {root}")
+    return sorted(files)
+
+
+def letterbox(image, imgsz=640):
+    """
+    Resize keeping aspect ratio and pad to imgsz x imgsz (YOLO's input layout):
+    returns a (1, 3, imgsz, imgsz) float32 RGB tensor in [0, 1].
+    """
+    h, w = image.shape[:2]
+    r = imgsz / max(h, w)
+    nh, nw = round(h * r), round(w * r)
+    canvas = np.full((imgsz, imgsz, 3), 114, np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return (canvas[:, :, ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+
+def _quantize_onnx(fp32_path, int8_path, images, imgsz, max_images=300):
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_static
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.it = iter(images[:max_images])
+
+        def get_next(self):
+            for p in self.it:
+                img = cv2.imread(p)
+                if img is not None:
+                    return {"images": letterbox(img, imgsz)}
+            return None
+
+    quantize_static(fp32_path, int8_path, Reader(), weight_type=QuantType.QInt8,
+                    activation_type=QuantType.QUInt8, per_channel=True)
+
+    # ultralytics reads stride/names/imgsz from the ONNX metadata; quantization drops it
+    meta = onnx.load(fp32_path, load_external_data=False).metadata_props
+    model = onnx.load(int8_path)
+    del model.metadata_props[:]
+    model.metadata_props.extend(meta)
+    onnx.save(model, int8_path)
+    return int8_path
@@ -0,0 +1,116 @@
+"""
+Compare inference backends for one YOLO model on a folder of images.
+
+For every backend it reports the median and p95 latency per image and the
+recall at IoU >= 0.5. Recall is measured against YOLO-format labels
+(<image>.txt next to each image) when they exist, otherwise against the
+torch backend's own detections. It then names the fastest backend that
+meets the recall target.
+
+    python benchmark_backends.py models/platebest.pt /path/to/images \\
+        --backends torch onnx openvino openvino-int8 --calibration plate_data.yaml --recall 0.95
+"""
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backends import IMAGE_EXTS
+from detector import PlateDetector, coords_of
+from plate_tracker import iou
+
+
+def load_labels(image_path, shape):
+    label_path = os.path.splitext(image_path)[0] + ".txt"
+    if not os.path.exists(label_path):
+        return None
+    h, w = shape[:2]
+    boxes = []
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            xc, yc, bw, bh = (float(v) for v in parts[1:5])
+            boxes.append((int((xc - bw / 2) * w), int((yc - bh / 2) * h),
+                          int((xc + bw / 2) * w), int((yc + bh / 2) * h)))
+    return boxes
+
+
+def recall(truth, found, threshold=0.5):
+    hits = total = 0
+    for gt, det in zip(truth, found):
+        total += len(gt)
+        hits += sum(1 for g in gt if any(iou(g, d) >= threshold for d in det))
+    return hits / total if total else 1.0
+
+
+def run_backend(model_path, backend, images, conf, calibration, warmup=3):
+    int8 = backend.endswith("-int8")
+    name = backend[:-len("-int8")] if int8 else backend
+    detector = PlateDetector(model_path, name, int8=int8, calibration=calibration)
+    for img in images[:warmup]:
+        detector.detect_batch([img], conf=conf)
+
+    found, times = [], []
+    for img in images:
+        start = time.perf_counter()
+        dets = detector.detect_batch([img], conf=conf)[0]
+        times.append(time.perf_counter() - start)
+        found.append([coords_of(d) for d in dets])
+    return found, np.array(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", help=".pt weights, e.g. models/platebest.pt")
+    parser.add_argument("images", help="folder of test images (optionally with YOLO .txt labels)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino"],
+                        help="any of torch, onnx, openvino, onnx-int8, openvino-int8")
+    parser.add_argument("--calibration", default="plate_data.yaml",
+                        help="dataset yaml for INT8 calibration, of the same kind of images as the model's")
+    parser.add_argument("--conf", type=float, default=0.35)
+    parser.add_argument("--recall", type=float, default=0.95, help="recall target")
+    parser.add_argument("--limit", type=int, default=200, help="max images to use")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in glob.glob(os.path.join(args.images, "**", "*"), recursive=True)
+                   if p.lower().endswith(IMAGE_EXTS))[:args.limit]
+    # drop unreadable files from both lists so labels stay with their images
+    loaded = [(p, img) for p, img in ((p, cv2.imread(p)) for p in paths) if img is not None]
+    if not loaded:
+        raise SystemExit(f"no images in {args.images}")
+    paths, images = (list(x) for x in zip(*loaded))
+
+    truth = [load_labels(p, img.shape) for p, img in zip(paths, images)]
+    labelled = all(t is not None for t in truth)
+    if not labelled:
+        print("No labels for every image: recall is measured against the torch backend.")
+        truth, _ = run_backend(args.model, "torch", images, args.conf, args.calibration)
+
+    print(f"{len(images)} images, recall target {args.recall:.2f}\n")
+    print(f"{'backend':<16}{'median ms':>10}{'p95 ms':>10}{'recall':>9}")
+    rows = []
+    for backend in args.backends:
+        try:
+            found, ms = run_backend(args.model, backend, images, args.conf, args.calibration)
+        except Exception as e:
+            print(f"{backend:<16}failed: {e}")
+            continue
+        r = recall(truth, found)
+        rows.append((backend, float(np.median(ms)), r))
+        print(f"{backend:<16}{np.median(ms):>10.1f}{np.percentile(ms, 95):>10.1f}{r:>9.3f}")
+
+    ok = [row for row in rows if row[2] >= args.recall]
+    if ok:
+        best = min(ok, key=lambda row: row[1])
+        print(f"\nFastest backend meeting the target: {best[0]} ({best[1]:.1f} ms median)")
+    else:
+        print("\nNo backend meets the recall target.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,38 @@
 from datetime import datetime
 import os
+import time
+import numpy as np
+from tariff import SLOT_SIZES, Tariff
 
 RATE_PER_MINUTE = 2
 MINIMUM_CHARGE_MINUTES = 1
 
-def calculate_bill(entry_time_str):
-    entry = datetime.strptime(entry_time_str, "%Y-%m-%d %H:%M:%S")
-    now = datetime.now()
-    diff = now - entry
-    minutes = max(MINIMUM_CHARGE_MINUTES, int(diff.total_seconds() // 60) + 1)
-    amount = minutes * RATE_PER_MINUTE
-    return minutes, amount
+# Flat rate for every vehicle type; swap in a Tariff with bands/caps/grace as needed.
+DEFAULT_TARIFF = Tariff(rates={size: RATE_PER_MINUTE for size in SLOT_SIZES},
+                        minimum_minutes=MINIMUM_CHARGE_MINUTES)
+
+def calculate_bill(entry_ts, exit_ts=None, vehicle_type=None, tariff=None):
+    """
+    entry_ts/exit_ts are epoch seconds; exit_ts defaults to now.
+    A legacy "YYYY-mm-dd HH:MM:SS" entry string is still accepted.
+    """
+    if isinstance(entry_ts, str):
+        entry_ts = datetime.strptime(entry_ts, "%Y-%m-%d %H:%M:%S").timestamp()
+    if exit_ts is None:
+        exit_ts = time.time()
+    return (tariff or DEFAULT_TARIFF).bill(entry_ts, exit_ts, vehicle_type)
+
+def recompute_revenue(db, start_ts, end_ts, tariff=None):
+    """
+    Re-bill every session that exited in [start_ts, end_ts) under tariff in one
+    vectorized call. Returns {"sessions", "minutes", "amount"}.
+    """
+    rows = db.closed_sessions_between(start_ts, end_ts)
+    entry = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    exit_ = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    vtypes = [r[2] for r in rows]
+    minutes, amounts = (tariff or DEFAULT_TARIFF).bill_many(entry, exit_, vtypes)
+    return {"sessions": len(rows), "minutes": int(minutes.sum()), "amount": int(amounts.sum())}
 
 def generate_invoice(plate, entry_time, exit_time, minutes, amount, vehicle_type="unknown", out_folder="output"):
     os.makedirs(out_folder, exist_ok=True)
@@ -0,0 +1,109 @@
+import cv2
+
+from detector import coords_of
+from plate_tracker import iou
+from vehicle_map import VEHICLE_CLASSES
+
+DEFAULT_LABEL = "family_sedan"
+
+
+class CascadeDetector:
+    """
+    Vehicle-first plate detection: VehicleDetector runs on the full frame,
+    then PlateDetector runs once, batched, over upscaled crops of the lower
+    part of each vehicle box. Each plate comes back linked to the vehicle it
+    was found on, so with several cars in view every plate gets its own
+    vehicle type.
+
+    lower_fraction is the share of the vehicle box (from the bottom) searched
+    for plates; crops are upscaled by up to upscale, capped so their longest
+    side stays within roi_size. With no vehicle in view the plate model runs
+    on the full frame when full_frame_fallback is set.
+    """
+
+    def __init__(self, plate_detector, vehicle_detector, lower_fraction=0.5, upscale=2.0, roi_size=640,
+                 plate_conf=0.35, vehicle_conf=0.35, full_frame_fallback=True, nms_iou=0.5):
+        self.plate_detector = plate_detector
+        self.vehicle_detector = vehicle_detector
+        self.lower_fraction = lower_fraction
+        self.upscale = upscale
+        self.roi_size = roi_size
+        self.plate_conf = plate_conf
+        self.vehicle_conf = vehicle_conf
+        self.full_frame_fallback = full_frame_fallback
+        self.nms_iou = nms_iou
+
+    def _rois(self, frame, vehicles):
+        h, w = frame.shape[:2]
+        rois = []
+        for v in vehicles:
+            x1, y1, x2, y2 = coords_of(v)
+            x1, x2 = max(0, x1), min(w, x2)
+            y1 = max(0, y2 - int((y2 - y1) * self.lower_fraction))
+            y2 = min(h, y2)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+            scale = max(1.0, min(self.upscale, self.roi_size / max(x2 - x1, y2 - y1)))
+            crop = frame[y1:y2, x1:x2]
+            if scale > 1.0:
+                crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+            rois.append((crop, (x1, y1), scale, v))
+        return rois
+
+    def detect(self, frame):
+        """
+        Returns list of {'coords': (x1,y1,x2,y2), 'confidence': float,
+        'vehicle_label': str, 'vehicle_coords': (x1,y1,x2,y2) or None},
+        plate coords in full-frame pixels, best first.
+        """
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames):
+        """
+        detect() for several frames with one vehicle pass over the frames and
+        one plate pass over all their vehicle crops.
+        """
+        if not frames:
+            return []
+        vehicles = self.vehicle_detector.detect_batch(frames, conf=self.vehicle_conf)
+        rois = [self._rois(frame, v) for frame, v in zip(frames, vehicles)]
+
+        flat = [roi for frame_rois in rois for roi in frame_rois]
+        plates = self.plate_detector.detect_batch([crop for crop, _, _, _ in flat], conf=self.plate_conf)
+        plates = iter(plates)
+
+        out = []
+        for frame, frame_rois in zip(frames, rois):
+            if not frame_rois:
+                out.append(self._full_frame(frame))
+                continue
+            detections = []
+            for (_, (ox, oy), scale, vehicle) in frame_rois:
+                label = VEHICLE_CLASSES.get(int(vehicle['class_id']), DEFAULT_LABEL)
+                for p in next(plates):
+                    px1, py1, px2, py2 = coords_of(p)
+                    detections.append({
+                        'coords': (ox + int(px1 / scale), oy + int(py1 / scale),
+                                   ox + int(px2 / scale), oy + int(py2 / scale)),
+                        'confidence': float(p['confidence']),
+                        'vehicle_label': label,
+                        'vehicle_coords': coords_of(vehicle),
+                    })
+            out.append(self._suppress(detections))
+        return out
+
+    def _full_frame(self, frame):
+        if not self.full_frame_fallback:
+            return []
+        return [{'coords': d['coords'], 'confidence': d['confidence'],
+                 'vehicle_label': DEFAULT_LABEL, 'vehicle_coords': None}
+                for d in self.plate_detector.detect(frame, conf=self.plate_conf)]
+
+    def _suppress(self, detections):
+        # overlapping vehicle boxes can both contain the same plate: keep the stronger one
+        detections.sort(key=lambda d: d['confidence'], reverse=True)
+        kept = []
+        for d in detections:
+            if all(iou(d['coords'], k['coords']) < self.nms_iou for k in kept):
+                kept.append(d)
+        return kept
@@ -1,11 +1,266 @@
+import re
 import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from concurrent.futures import Future
 from datetime import datetime
+from archiver import Archiver
+from group_commit import GroupCommitWriter
+from slot_allocator import SlotAllocator
+
+
+def _migrate_v1_indexes(conn):
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_parking_active_plate
+        ON parking(plate) WHERE status='IN'
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_slots_vehicle_number
+        ON parking_slots(vehicle_number)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_slots_type_occupied
+        ON parking_slots(slot_type, is_occupied, slot_id)
+    """)
+
+
+def _create_plate_fts(conn):
+    """
+    Trigram index so substring plate searches don't scan the table.
+    Contentless and insert-only: plates are never edited once recorded.
+    Returns the error if this SQLite build has no FTS5 trigram tokenizer, else None.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name='parking_plate_fts'").fetchone():
+        return None
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE parking_plate_fts
+            USING fts5(plate, content='', tokenize='trigram')
+        """)
+    except sqlite3.OperationalError as e:
+        return e
+    tables = ["parking"]
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name='parking_archive_partitions'").fetchone():
+        tables += [r[0] for r in conn.execute("SELECT name FROM parking_archive_partitions")]
+    for table in tables:
+        conn.execute(f"INSERT INTO parking_plate_fts(rowid, plate) SELECT id, plate FROM {table}")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS parking_plate_fts_insert AFTER INSERT ON parking
+        BEGIN
+            INSERT INTO parking_plate_fts(rowid, plate) VALUES (new.id, new.plate);
+        END
+    """)
+    return None
+
+
+def _migrate_v2_plate_fts(conn):
+    # without FTS5 trigram the step still counts as applied; Database retries
+    # the index on every open, so it appears once SQLite is upgraded
+    _create_plate_fts(conn)
+
+
+def _migrate_v3_archive_registry(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS parking_archive_partitions(
+            name TEXT PRIMARY KEY,
+            period TEXT
+        )
+    """)
+
+
+def _migrate_v4_epoch_timestamps(conn):
+    # integer epoch twins of the text timestamps; text stays for display/invoices
+    tables = ["parking"] + [r[0] for r in conn.execute("SELECT name FROM parking_archive_partitions")]
+    for table in tables:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN entry_ts INTEGER")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN exit_ts INTEGER")
+        conn.execute(f"""
+            UPDATE {table}
+            SET entry_ts = CAST(strftime('%s', entry_time, 'utc') AS INTEGER),
+                exit_ts = CAST(strftime('%s', exit_time, 'utc') AS INTEGER)
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_exit_ts ON {table}(exit_ts)")
+    conn.execute("ALTER TABLE parking_slots ADD COLUMN entry_ts INTEGER")
+    conn.execute("UPDATE parking_slots SET entry_ts = CAST(strftime('%s', entry_time, 'utc') AS INTEGER)")
+
+
+def _migrate_v5_occupancy_counters(conn):
+    # per-type counters kept exact by triggers, for every process sharing the file
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS slot_occupancy(
+            slot_type TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            occupied INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("DELETE FROM slot_occupancy")
+    conn.execute("""
+        INSERT INTO slot_occupancy (slot_type, total, occupied)
+        SELECT slot_type, COUNT(*), SUM(is_occupied != 0)
+        FROM parking_slots
+        GROUP BY slot_type
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS slot_occupancy_insert AFTER INSERT ON parking_slots
+        BEGIN
+            INSERT OR IGNORE INTO slot_occupancy (slot_type) VALUES (new.slot_type);
+            UPDATE slot_occupancy
+            SET total = total + 1, occupied = occupied + (new.is_occupied != 0)
+            WHERE slot_type = new.slot_type;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS slot_occupancy_delete AFTER DELETE ON parking_slots
+        BEGIN
+            UPDATE slot_occupancy
+            SET total = total - 1, occupied = occupied - (old.is_occupied != 0)
+            WHERE slot_type = old.slot_type;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS slot_occupancy_update
+        AFTER UPDATE OF is_occupied, slot_type ON parking_slots
+        BEGIN
+            UPDATE slot_occupancy
+            SET total = total - 1, occupied = occupied - (old.is_occupied != 0)
+            WHERE slot_type = old.slot_type;
+            INSERT OR IGNORE INTO slot_occupancy (slot_type) VALUES (new.slot_type);
+            UPDATE slot_occupancy
+            SET total = total + 1, occupied = occupied + (new.is_occupied != 0)
+            WHERE slot_type = new.slot_type;
+        END
+    """)
+
+
+# Applied in order; PRAGMA user_version records how many have run.
+MIGRATIONS = [
+    _migrate_v1_indexes,
+    _migrate_v2_plate_fts,
+    _migrate_v3_archive_registry,
+    _migrate_v4_epoch_timestamps,
+    _migrate_v5_occupancy_counters,
+]
+
+MAX_ROW_ID = (1 << 63) - 1
+FTS_MIN_QUERY = 3  # trigram index needs at least one full trigram
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+BUSY_RETRIES = 5
+BUSY_BACKOFF_SECONDS = 0.05
+
+
+def _now(ts=None):
+    """
+    (epoch seconds, local "YYYY-mm-dd HH:MM:SS") for ts, or for the current time.
+    """
+    ts = int(time.time()) if ts is None else int(ts)
+    return ts, datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _is_busy(exc):
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(exc) or "busy" in str(exc)
+
+
+class _ThreadConnection:
+    # held in threading.local; when its thread exits the finalizer closes conn
+    def __init__(self, conn):
+        self.conn = conn
+
 
 class Database:
-    def __init__(self, db_path="parking.db"):
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+    def __init__(self, db_path="parking.db", group_commit=False, commit_interval_ms=20,
+                 commit_batch_size=64, wal=True, synchronous=None, busy_timeout=5.0,
+                 archive_every=None, archive_interval=None):
+        """
+        Each thread gets its own connection (see conn), so readers never
+        share a connection with a writer.
+        group_commit: route submit() events through one writer thread that commits
+        them in batches; implies WAL journaling.
+        synchronous: PRAGMA synchronous level (e.g. "NORMAL", "FULL"), default unchanged.
+        busy_timeout: seconds a connection waits on a locked database before SQLITE_BUSY.
+        archive_every / archive_interval: move closed sessions to the archive
+        partitions after that many exits and/or every that many seconds.
+        """
+        if synchronous is not None and str(synchronous).upper() not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"synchronous must be one of {SYNCHRONOUS_LEVELS}")
+
+        self.db_path = db_path
+        self.wal = wal or group_commit
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._writer = None
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._pool = set()
+        self.slots = SlotAllocator()
+        # only reads PRAGMA data_version, to notice commits from other connections
+        self._slots_conn = self._connect()
+        self._slots_lock = threading.Lock()
+        self._slots_version = None
         self.create_tables()
+        self.load_slots()
+        self.has_plate_index = self._ensure_plate_index()
+
+        if group_commit:
+            self._writer = GroupCommitWriter(self._connect(), commit_interval_ms,
+                                             commit_batch_size, on_rollback=self.load_slots)
+
+        self._archiver = None
+        if archive_every or archive_interval:
+            self._archiver = Archiver(self, archive_every, archive_interval)
+
+    def _connect(self):
+        # autocommit; writes are grouped explicitly with transaction()
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if self.wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    @property
+    def conn(self):
+        # inside a group-commit batch every method must use the writer's connection
+        if self._writer is not None and self._writer.owns_current_thread():
+            return self._writer.conn
+
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = _ThreadConnection(self._connect())
+            with self._pool_lock:
+                self._pool = {f for f in self._pool if f.alive}
+                self._pool.add(weakref.finalize(holder, holder.conn.close))
+            self._local.holder = holder
+        return holder.conn
+
+    def open_connection(self):
+        """
+        A new connection configured like the pooled ones, owned by the caller.
+        """
+        return self._connect()
+
+    def close(self):
+        self._slots_conn.close()
+        if self._archiver is not None:
+            self._archiver.close()
+            self._archiver = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer.conn.close()
+            self._writer = None
+        with self._pool_lock:
+            for finalizer in self._pool:
+                finalizer()
+            self._pool.clear()
+        self._local = threading.local()
 
     def create_tables(self):
 
@@ -33,9 +288,27 @@ class Database:
             entry_time TEXT
         );
         """)
-        self.conn.commit()
+        self.migrate()
         self._ensure_default_slots()
 
+    def _ensure_plate_index(self):
+        with self.transaction():
+            error = _create_plate_fts(self.conn)
+        if error is not None:
+            print(f"FTS5 trigram index unavailable, plate search will scan: {error}")
+        return error is None
+
+    def migrate(self):
+        """
+        Bring an existing parking.db up to the latest schema version in place.
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self.transaction():
+                step(self.conn)
+                self.conn.execute(f"PRAGMA user_version = {target}")
+            print(f"Database migrated to version {target}.")
+
     def _ensure_default_slots(self):
         cur = self.conn.execute("SELECT COUNT(*) FROM parking_slots")
         count = cur.fetchone()[0]
@@ -48,37 +321,125 @@ class Database:
                 "large": 30,
                 "xl": 10
             }
-            for slot_type, qty in slot_config.items():
-                for i in range(1, qty + 1):
-                    slot_id = f"{slot_type.upper()}-{i}"
-                    self.conn.execute("""
-                        INSERT INTO parking_slots (slot_id, slot_type)
-                        VALUES (?, ?)
-                    """, (slot_id, slot_type))
-            self.conn.commit()
+            with self.transaction():
+                for slot_type, qty in slot_config.items():
+                    for i in range(1, qty + 1):
+                        slot_id = f"{slot_type.upper()}-{i}"
+                        self.conn.execute("""
+                            INSERT INTO parking_slots (slot_id, slot_type)
+                            VALUES (?, ?)
+                        """, (slot_id, slot_type))
             print("Default parking slots created.")
 
+    @contextmanager
+    def transaction(self):
+        """
+        Run the enclosed statements as one BEGIN IMMEDIATE ... COMMIT.
+        Nested calls join the outer transaction, so a whole gate event commits once.
+        """
+        if self.conn.in_transaction:
+            yield self.conn
+            return
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.rollback()
+            # the allocator may hold reservations that were just rolled back
+            self.load_slots()
+            raise
+        else:
+            self.conn.commit()
+
+    def submit(self, fn, *args):
+        """
+        Run fn(*args) as one write event and return a Future that resolves once
+        the event is durable. With group_commit the event joins the writer's next
+        batch; otherwise it commits in its own transaction before returning.
+        """
+        if self._writer is not None:
+            return self._writer.submit(fn, *args)
+
+        fut = Future()
+        try:
+            result = self._retry_busy(self._run_in_transaction, fn, args)
+        except Exception as e:
+            fut.set_exception(e)
+        else:
+            fut.set_result(result)
+        return fut
+
+    def _run_in_transaction(self, fn, args):
+        with self.transaction():
+            return fn(*args)
+
+    def _retry_busy(self, fn, *args):
+        # busy_timeout already waited; back off and retry the whole unit a few times
+        for attempt in range(BUSY_RETRIES):
+            try:
+                return fn(*args)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == BUSY_RETRIES - 1 or self.conn.in_transaction:
+                    raise
+                time.sleep(BUSY_BACKOFF_SECONDS * (2 ** attempt))
+
+    def load_slots(self):
+        """
+        (Re)build the in-memory slot allocator from parking_slots.
+        """
+        with self._slots_lock:
+            self._slots_version = self._slots_conn.execute("PRAGMA data_version").fetchone()[0]
+        cur = self.conn.execute("SELECT slot_id, slot_type, is_occupied FROM parking_slots ORDER BY rowid")
+        self.slots.load(cur.fetchall())
+
 
     def insert_entry(self, plate, vehicle_type, slot):
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.conn.execute("""
-            INSERT INTO parking (plate, vehicle_type, slot, entry_time, status)
-            VALUES (?, ?, ?, ?, 'IN')
-        """, (plate, vehicle_type, slot, now))
-        self.conn.commit()
+        """
+        Returns the id of the new parking row.
+        """
+        now_ts, now = _now()
+        with self.transaction():
+            cur = self.conn.execute("""
+                INSERT INTO parking (plate, vehicle_type, slot, entry_time, entry_ts, status)
+                VALUES (?, ?, ?, ?, ?, 'IN')
+                RETURNING id
+            """, (plate, vehicle_type, slot, now, now_ts))
+            return cur.fetchone()[0]
 
     def close_parking(self, plate, duration_minutes, amount):
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.conn.execute("""
-            UPDATE parking
-            SET exit_time=?, duration_minutes=?, amount=?, status='OUT'
-            WHERE plate=? AND status='IN'
-        """, (now, duration_minutes, amount, plate))
-        self.conn.commit()
+        now_ts, now = _now()
+        with self.transaction():
+            self.conn.execute("""
+                UPDATE parking
+                SET exit_time=?, exit_ts=?, duration_minutes=?, amount=?, status='OUT'
+                WHERE plate=? AND status='IN'
+            """, (now, now_ts, duration_minutes, amount, plate))
+        if self._archiver is not None:
+            self._archiver.notify_closed()
+
+    def close_parking_by_id(self, entry_id, duration_minutes, amount, exit_ts=None):
+        """
+        Close an active parking row by primary key. exit_ts (epoch seconds)
+        defaults to now; pass the value the bill was computed with.
+        Returns the recorded exit_time, or None if the row was not active.
+        """
+        exit_ts, now = _now(exit_ts)
+        with self.transaction():
+            cur = self.conn.execute("""
+                UPDATE parking
+                SET exit_time=?, exit_ts=?, duration_minutes=?, amount=?, status='OUT'
+                WHERE id=? AND status='IN'
+                RETURNING exit_time
+            """, (now, exit_ts, duration_minutes, amount, entry_id))
+            row = cur.fetchone()
+        if row and self._archiver is not None:
+            self._archiver.notify_closed()
+        return row["exit_time"] if row else None
 
     def get_active_entry(self, plate):
         cur = self.conn.execute("""
-            SELECT id, entry_time, vehicle_type, slot
+            SELECT id, entry_time, entry_ts, vehicle_type, slot
             FROM parking
             WHERE plate=? AND status='IN'
             ORDER BY id DESC
@@ -87,65 +448,259 @@ class Database:
         row = cur.fetchone()
         return row if row else None
 
+    def active_plates(self, conn=None):
+        """
+        Plates currently parked (served by idx_parking_active_plate).
+        """
+        rows = (conn or self.conn).execute("SELECT DISTINCT plate FROM parking WHERE status='IN'")
+        return [row[0] for row in rows]
+
     def list_all(self):
-        cur = self.conn.execute("SELECT * FROM parking ORDER BY id DESC")
-        return [dict(r) for r in cur.fetchall()]
+        return list(self.iter_all())
 
     def search(self, plate_query):
-        cur = self.conn.execute("SELECT * FROM parking WHERE plate LIKE ? ORDER BY id DESC",
-                                (f"%{plate_query}%",))
+        return list(self.iter_search(plate_query))
+
+    def list_page(self, before_id=None, limit=100):
+        """
+        One page of parking rows, newest first, with id < before_id.
+        Pass the last id of a page as before_id to get the next one.
+        """
+        before_id = MAX_ROW_ID if before_id is None else before_id
+        return self._history_query("id < :before", {"before": before_id, "limit": limit})
+
+    def search_page(self, plate_query, before_id=None, limit=100):
+        """
+        Like list_page, restricted to plates containing plate_query.
+        """
+        before_id = MAX_ROW_ID if before_id is None else before_id
+        if self.has_plate_index and len(plate_query) >= FTS_MIN_QUERY:
+            # the index covers hot and archived rows alike; resolve ids per partition
+            phrase = '"' + plate_query.replace('"', '""') + '"'
+            cur = self.conn.execute("""
+                SELECT rowid FROM parking_plate_fts
+                WHERE parking_plate_fts MATCH ? AND rowid < ?
+                ORDER BY rowid DESC
+                LIMIT ?
+            """, (phrase, before_id, limit))
+            ids = [r[0] for r in cur.fetchall()]
+            if not ids:
+                return []
+            return self._history_query(f"id IN ({','.join(map(str, ids))})", {"limit": limit})
+
+        return self._history_query("plate LIKE :q AND id < :before",
+                                   {"q": f"%{plate_query}%", "before": before_id, "limit": limit})
+
+    def _history_query(self, where, params):
+        # hot table plus every archive partition, merged newest first
+        columns = ", ".join(self._parking_columns())
+        tables = ["parking"] + self.archive_partitions()
+        sql = " UNION ALL ".join(f"SELECT {columns} FROM {t} WHERE {where}" for t in tables)
+        cur = self.conn.execute(sql + " ORDER BY id DESC LIMIT :limit", params)
         return [dict(r) for r in cur.fetchall()]
 
+    def iter_all(self, page_size=500):
+        """
+        Stream every parking row newest first, one keyset page at a time.
+        """
+        return self._iter_pages(self.list_page, page_size)
+
+    def iter_search(self, plate_query, page_size=500):
+        return self._iter_pages(lambda before_id, limit: self.search_page(plate_query, before_id, limit),
+                                page_size)
+
+    def _iter_pages(self, fetch_page, page_size):
+        before_id = None
+        while True:
+            rows = fetch_page(before_id, page_size)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            before_id = rows[-1]["id"]
+
+
+    def revenue_between(self, start_ts, end_ts):
+        """
+        Totals for sessions that exited in [start_ts, end_ts) (epoch seconds),
+        across the hot table and every archive partition.
+        """
+        tables = ["parking"] + self.archive_partitions()
+        parts = " UNION ALL ".join(
+            f"SELECT duration_minutes, amount FROM {t} WHERE exit_ts >= :start AND exit_ts < :end"
+            for t in tables)
+        row = self.conn.execute(f"""
+            SELECT COUNT(*) AS sessions,
+                   COALESCE(SUM(duration_minutes), 0) AS minutes,
+                   COALESCE(SUM(amount), 0) AS amount
+            FROM ({parts})
+        """, {"start": int(start_ts), "end": int(end_ts)}).fetchone()
+        return dict(row)
+
+    def closed_sessions_between(self, start_ts, end_ts):
+        """
+        (entry_ts, exit_ts, vehicle_type) tuples for sessions that exited in
+        [start_ts, end_ts), across all partitions; input for batch billing.
+        """
+        tables = ["parking"] + self.archive_partitions()
+        sql = " UNION ALL ".join(
+            f"SELECT entry_ts, exit_ts, vehicle_type FROM {t} "
+            f"WHERE exit_ts >= :start AND exit_ts < :end AND entry_ts IS NOT NULL"
+            for t in tables)
+        cur = self.conn.execute(sql, {"start": int(start_ts), "end": int(end_ts)})
+        return [tuple(r) for r in cur.fetchall()]
+
+    def _parking_columns(self):
+        return [r["name"] for r in self.conn.execute("PRAGMA table_info(parking)")]
+
+    def archive_partitions(self):
+        """
+        Names of the archive tables, newest period first.
+        """
+        cur = self.conn.execute("SELECT name FROM parking_archive_partitions ORDER BY period DESC")
+        return [r["name"] for r in cur.fetchall()]
+
+    def _ensure_partition(self, period):
+        if period and re.fullmatch(r"\d{4}-\d{2}", period):
+            name = "parking_archive_" + period.replace("-", "")
+        else:
+            name, period = "parking_archive_undated", "0000-00"
+
+        defs = []
+        for col in self.conn.execute("PRAGMA table_info(parking)"):
+            if col["pk"]:
+                defs.append(f"{col['name']} INTEGER PRIMARY KEY")
+            else:
+                defs.append(f"{col['name']} {col['type']}")
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(defs)})")
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_exit_ts ON {name}(exit_ts)")
+        self.conn.execute("INSERT OR IGNORE INTO parking_archive_partitions (name, period) VALUES (?, ?)",
+                          (name, period))
+        return name
+
+    def archive_closed(self, batch_size=1000):
+        """
+        Move status='OUT' rows from parking into monthly parking_archive_YYYYMM
+        tables (by exit month), batch_size rows per transaction.
+        Returns the number of rows moved.
+        """
+        columns = ", ".join(self._parking_columns())
+        moved = 0
+        while True:
+            with self.transaction():
+                cur = self.conn.execute("""
+                    SELECT id, substr(COALESCE(exit_time, entry_time), 1, 7) AS period
+                    FROM parking
+                    WHERE status='OUT'
+                    ORDER BY id
+                    LIMIT ?
+                """, (batch_size,))
+                rows = cur.fetchall()
+
+                by_period = {}
+                for r in rows:
+                    by_period.setdefault(r["period"], []).append(r["id"])
+                for period, ids in by_period.items():
+                    table = self._ensure_partition(period)
+                    marks = ",".join("?" * len(ids))
+                    self.conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM parking WHERE id IN ({marks})", ids)
+                    self.conn.execute(f"DELETE FROM parking WHERE id IN ({marks})", ids)
+
+            moved += len(rows)
+            if len(rows) < batch_size:
+                return moved
+
+    def _sync_slots(self):
+        """
+        Bring the allocator up to date after commits from other connections,
+        e.g. the exit gate's process freeing slots. The trigger-maintained
+        counters are compared first; the table is only reloaded if they
+        disagree with the free-lists.
+        """
+        with self._slots_lock:
+            version = self._slots_conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._slots_version:
+                return
+            self._slots_version = version
+        free = self.slots.free_counts()
+        cur = self.conn.execute("SELECT slot_type, total - occupied AS free FROM slot_occupancy")
+        if any(free.get(r["slot_type"], 0) != r["free"] for r in cur.fetchall()):
+            self.load_slots()
+
+    def _free_slot_from_index(self, slot_type):
+        # the free-list is empty or stale: ask the (slot_type, is_occupied) index
+        row = self.conn.execute("SELECT slot_id FROM parking_slots WHERE slot_type=? AND is_occupied=0 LIMIT 1",
+                                (slot_type,)).fetchone()
+        if row is None:
+            return None
+        self.slots.claim(row["slot_id"], slot_type)
+        return row["slot_id"]
 
     def find_and_reserve_slot(self, slot_type, plate_number):
         """
         Atomically reserve a free slot of slot_type.
         Returns slot_id or None.
         """
-        cur = self.conn.execute("""
-            SELECT slot_id FROM parking_slots
-            WHERE slot_type=? AND is_occupied=0
-            LIMIT 1
-        """, (slot_type,))
-        row = cur.fetchone()
-        if not row:
-            return None
-
-        slot_id = row["slot_id"]
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        update = self.conn.execute("""
-            UPDATE parking_slots
-            SET is_occupied=1, vehicle_number=?, entry_time=?
-            WHERE slot_id=? AND is_occupied=0
-        """, (plate_number, now, slot_id))
-        self.conn.commit()
+        self._sync_slots()
+        for _ in range(3):
+            slot_id = self.slots.acquire(slot_type) or self._free_slot_from_index(slot_type)
+            if slot_id is None:
+                return None
 
-        return slot_id if update.rowcount == 1 else None
+            now_ts, now = _now()
+            with self.transaction():
+                cur = self.conn.execute("""
+                    UPDATE parking_slots
+                    SET is_occupied=1, vehicle_number=?, entry_time=?, entry_ts=?
+                    WHERE slot_id=? AND is_occupied=0
+                    RETURNING slot_id
+                """, (plate_number, now, now_ts, slot_id))
+                row = cur.fetchone()
+            if row:
+                return row["slot_id"]
+            # taken behind our back (another process sharing parking.db); the
+            # allocator now counts it occupied, so try the next one
+        return None
 
     def reserve_any_slot(self, plate_number):
 
-        for t in ("medium", "large", "xl", "small"):
+        order = ("medium", "large", "xl", "small")
+        for t in order:
             s = self.find_and_reserve_slot(t, plate_number)
             if s:
                 return s
         return None
 
     def release_slot_by_id(self, slot_id):
-        self.conn.execute("""
-            UPDATE parking_slots
-            SET is_occupied=0, vehicle_number=NULL, entry_time=NULL
-            WHERE slot_id=?
-        """, (slot_id,))
-        self.conn.commit()
+        """
+        Returns slot_id if it existed, else None.
+        """
+        with self.transaction():
+            cur = self.conn.execute("""
+                UPDATE parking_slots
+                SET is_occupied=0, vehicle_number=NULL, entry_time=NULL, entry_ts=NULL
+                WHERE slot_id=?
+                RETURNING slot_id
+            """, (slot_id,))
+            row = cur.fetchone()
+        self.slots.release(slot_id)
+        return row["slot_id"] if row else None
 
     def release_slot_by_plate(self, plate_number):
         cur = self.conn.execute("SELECT slot_id FROM parking_slots WHERE vehicle_number=?", (plate_number,))
         row = cur.fetchone()
         if not row:
             return None
-        slot_id = row["slot_id"]
-        self.release_slot_by_id(slot_id)
-        return slot_id
+        return self.release_slot_by_id(row["slot_id"])
+
+    def get_occupancy(self):
+        """
+        {slot_type: {"total", "occupied", "free"}} from the trigger-maintained
+        counters; reads one row per slot type regardless of lot size.
+        """
+        cur = self.conn.execute("SELECT slot_type, total, occupied FROM slot_occupancy ORDER BY slot_type")
+        return {r["slot_type"]: {"total": r["total"], "occupied": r["occupied"],
+                                 "free": r["total"] - r["occupied"]}
+                for r in cur.fetchall()}
 
     def get_slot_status(self):
         cur = self.conn.execute("SELECT * FROM parking_slots ORDER BY slot_type, slot_id")
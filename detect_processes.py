@@ -0,0 +1,141 @@
+import multiprocessing as mp
+import queue
+
+import numpy as np
+
+from backends import ensure_exported
+from shm_ring import SharedFrameRing
+
+
+def _worker(ring, results, plate_model, vehicle_model, backend, int8, batch_size):
+    # models are built here, inside the worker process
+    from detector import DETECTION_DTYPE, PlateDetector
+    from gate_pipeline import vehicle_label
+    from vehicle_detector import VehicleDetector
+
+    plates = PlateDetector(plate_model, backend, int8=int8)
+    vehicles = VehicleDetector(vehicle_model, backend, int8=int8) if vehicle_model else None
+
+    done = False
+    while not done:
+        msg = ring.ready_q.get()
+        if msg is None:
+            break
+        batch = [msg]
+        while len(batch) < batch_size:
+            try:
+                msg = ring.ready_q.get_nowait()
+            except queue.Empty:
+                break
+            if msg is None:
+                done = True
+                break
+            batch.append(msg)
+
+        views = [ring.view(m) for m in batch]
+        try:
+            found = plates.detect_batch(views)
+            labels = [vehicle_label(v) for v in vehicles.detect_batch(views)] if vehicles \
+                else [None] * len(batch)
+        except Exception as e:
+            print("Detector worker error:", e)
+            found = [np.empty(0, DETECTION_DTYPE)] * len(batch)
+            labels = [None] * len(batch)
+        for m, dets, label in zip(batch, found, labels):
+            # the slot stays held until the parent has cut its crops
+            results.put((m, dets, label))
+    results.put(None)
+
+
+class DetectionProcesses:
+    """
+    Plate (and optional vehicle) detection in worker processes fed through a
+    SharedFrameRing. submit() copies a frame into the ring once. Workers
+    batch whatever frames are waiting into one detect_batch call on the
+    shared-memory views and return (msg, plate_records, vehicle_label).
+    The caller reads the frame back with ring.view(msg) and frees its slot
+    with ring.release(msg[0]).
+
+    Each worker loads its own models, so size processes to the cores free
+    of capture and OCR. The parent never loads them: missing ONNX/OpenVINO
+    exports are created once here, before any worker starts. INT8 exports
+    are calibrated on calibration (plate model) and vehicle_calibration
+    (vehicle model, defaults to calibration). The ring is created on the first submit(),
+    sized to that frame.
+    """
+
+    def __init__(self, plate_model, vehicle_model=None, backend="torch", int8=False, processes=2, slots=None,
+                 batch_size=4, calibration=None, vehicle_calibration=None):
+        ensure_exported(plate_model, backend, int8=int8, calibration=calibration)
+        if vehicle_model:
+            ensure_exported(vehicle_model, backend, int8=int8, calibration=vehicle_calibration or calibration)
+        self.plate_model = plate_model
+        self.vehicle_model = vehicle_model
+        self.backend = backend
+        self.int8 = int8
+        self.processes = processes
+        self.slots = slots or processes * batch_size + 2
+        self.batch_size = batch_size
+        self.ring = None
+        self.results = None
+        self._procs = []
+        self._ctx = mp.get_context("spawn")
+
+    def start(self, frame_shape):
+        self.ring = SharedFrameRing(frame_shape, self.slots, ctx=self._ctx)
+        self.results = self._ctx.Queue()
+        self._procs = [self._ctx.Process(target=_worker, daemon=True,
+                                         args=(self.ring, self.results, self.plate_model, self.vehicle_model,
+                                               self.backend, self.int8, self.batch_size))
+                       for _ in range(self.processes)]
+        for p in self._procs:
+            p.start()
+
+    def submit(self, frame, idx, timestamp, drop=True, timeout=None):
+        """
+        Queue frame for detection. Returns the idx of a queued frame that was
+        dropped to make room, or None; with drop=False it waits for room
+        instead, raising queue.Empty after timeout seconds.
+        """
+        if self.ring is None:
+            self.start(frame.shape)
+        return self.ring.write(frame, idx, timestamp, timeout=timeout, drop=drop)
+
+    def get(self, timeout=None):
+        """
+        Next (msg, plate_records, vehicle_label) result, or None from a worker
+        that has stopped; raises queue.Empty on timeout.
+        """
+        return self.results.get(timeout=timeout)
+
+    def stop(self):
+        """
+        Ask the workers to finish the frames already queued and exit.
+        """
+        if self.ring is not None:
+            self.ring.stop_readers(len(self._procs))
+
+    def alive(self):
+        return any(p.is_alive() for p in self._procs)
+
+    def close(self):
+        # drain the result queue so exiting workers can flush it
+        finished = 0
+        while finished < len(self._procs) and self.results is not None:
+            try:
+                if self.results.get(timeout=1.0) is None:
+                    finished += 1
+            except queue.Empty:
+                if not self.alive():
+                    break
+        for p in self._procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    @property
+    def dropped(self):
+        return self.ring.dropped if self.ring is not None else 0
@@ -1,22 +1,54 @@
-from ultralytics import YOLO
+import numpy as np
+
+from backends import load_model
+
+# one row per detection; detect_batch returns one such array per frame
+DETECTION_DTYPE = np.dtype([("x1", np.int32), ("y1", np.int32), ("x2", np.int32), ("y2", np.int32),
+                            ("confidence", np.float32), ("class_id", np.int32)])
+
+
+def decode_boxes(result):
+    """
+    Decode one ultralytics Results into a DETECTION_DTYPE array, moving each
+    box tensor off the device once instead of once per box.
+    """
+    boxes = result.boxes
+    out = np.empty(len(boxes), dtype=DETECTION_DTYPE)
+    if len(boxes) == 0:
+        return out
+    xyxy = boxes.xyxy.cpu().numpy()
+    out["x1"], out["y1"], out["x2"], out["y2"] = xyxy.astype(np.int32).T
+    out["confidence"] = boxes.conf.cpu().numpy()
+    out["class_id"] = boxes.cls.cpu().numpy()
+    return out
+
+
+def coords_of(det):
+    return int(det["x1"]), int(det["y1"]), int(det["x2"]), int(det["y2"])
+
 
 class PlateDetector:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, backend="torch", int8=False, calibration=None):
+        """
+        backend: "torch" (the .pt weights), "onnx" or "openvino"; see backends.load_model.
+        """
+        self.model = load_model(model_path, backend, int8=int8, calibration=calibration)
 
     def detect(self, frame, conf=0.35):
         """
         Returns list of detections: {'coords':(x1,y1,x2,y2),'confidence':float}
         """
-        result = self.model(frame, conf=conf, verbose=False)
-        detection = []
-        for r in result:
-            for box in r.boxes:
-                xyxy = box.xyxy[0].cpu().numpy() if hasattr(box.xyxy[0], 'cpu') else box.xyxy[0]
-                x1, y1, x2, y2 = map(int, xyxy)
-                conf_score = float(box.conf[0].cpu().numpy()) if hasattr(box.conf[0], 'cpu') else float(box.conf[0])
-                detection.append({'coords': (x1, y1, x2, y2), "confidence": conf_score})
-        return detection
+        return [{'coords': coords_of(d), "confidence": float(d["confidence"])}
+                for d in self.detect_batch([frame], conf=conf)[0]]
+
+    def detect_batch(self, frames, conf=0.35):
+        """
+        One forward pass over a list of frames. Returns a DETECTION_DTYPE array per frame.
+        """
+        if not frames:
+            return []
+        results = self.model(list(frames), conf=conf, verbose=False)
+        return [decode_boxes(r) for r in results]
 
     def crop(self, frame, coords):
         x1, y1, x2, y2 = coords
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+
+Frame = namedtuple("Frame", "idx timestamp image")
+
+LIVE_PREFIXES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+def is_live(source):
+    """
+    Webcam indexes and network streams are live; anything else is a file.
+    """
+    if isinstance(source, int) or str(source).isdigit():
+        return True
+    return str(source).lower().startswith(LIVE_PREFIXES)
+
+
+class LatestFrameCapture:
+    """
+    Decodes a video source on its own thread and keeps only the newest
+    buffer_size frames, each a Frame(idx, timestamp, image) stamped with the
+    wall-clock time it was decoded.
+
+    For live sources (webcam, RTSP/HTTP) read() always returns the newest
+    frame, and frames that were never read count as dropped. Slow consumers
+    therefore see current frames instead of a backlog. For files nothing is
+    dropped: the decoder waits until frames are read, so every frame gets
+    processed. Pass drop= to override. Network streams reopen after
+    reconnect_delay seconds when they fail.
+    """
+
+    def __init__(self, source, buffer_size=1, drop=None, reconnect_delay=2.0, start=True):
+        self.source = int(source) if str(source).isdigit() else source
+        self.live = is_live(self.source)
+        self.drop = self.live if drop is None else drop
+        self.reconnect_delay = reconnect_delay
+        self.decoded = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.finished = False
+
+        self._ring = deque(maxlen=max(1, buffer_size))
+        self._last = -1
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._cap = self._open()
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        if start:
+            self.start()
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        if self.live:
+            # keep the driver's own queue short; buffering happens here
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def start(self):
+        if not self._thread.is_alive() and not self.finished:
+            self._thread.start()
+
+    def _run(self):
+        idx = 0
+        try:
+            while not self._stop.is_set():
+                ret, image = self._cap.read()
+                if not ret:
+                    if not self.live or isinstance(self.source, int) or not self._reconnect():
+                        break
+                    continue
+
+                frame = Frame(idx, time.time(), image)
+                with self._cond:
+                    while (not self.drop and self._ring and len(self._ring) == self._ring.maxlen
+                           and self._ring[0].idx > self._last and not self._stop.is_set()):
+                        self._cond.wait()
+                    self._ring.append(frame)
+                    self.decoded += 1
+                    self._cond.notify_all()
+                idx += 1
+        finally:
+            with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+    def _reconnect(self):
+        self._cap.release()
+        while not self._stop.wait(self.reconnect_delay):
+            self._cap = self._open()
+            if self._cap.isOpened():
+                self.reconnects += 1
+                return True
+        return False
+
+    def read(self, timeout=None):
+        """
+        Next frame to process: the newest one for live sources, the next in
+        order for files. Blocks up to timeout seconds (None = forever).
+        Returns None on timeout or once the stream has ended and been read out.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                pending = [f for f in self._ring if f.idx > self._last]
+                if pending:
+                    frame = pending[-1] if self.drop else pending[0]
+                    self.dropped += frame.idx - self._last - 1
+                    self.delivered += 1
+                    self._last = frame.idx
+                    self._cond.notify_all()
+                    return frame
+                if self.finished:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def exhausted(self):
+        """
+        True once the stream has ended and every frame it will deliver was read.
+        """
+        with self._cond:
+            return self.finished and not any(f.idx > self._last for f in self._ring)
+
+    def latest(self):
+        """
+        Newest decoded frame without consuming it, or None.
+        """
+        with self._cond:
+            return self._ring[-1] if self._ring else None
+
+    def frames(self):
+        """
+        The buffered frames, oldest first.
+        """
+        with self._cond:
+            return list(self._ring)
+
+    def stats(self):
+        newest = self.latest()
+        return {
+            "decoded": self.decoded,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "age_ms": round((time.time() - newest.timestamp) * 1000) if newest else None,
+        }
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._cap.release()
@@ -0,0 +1,450 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+
+import cv2
+
+from cascade import CascadeDetector
+from detector import coords_of
+from frame_capture import LatestFrameCapture
+from normalize_plate import normalize_many
+from plate_tracker import PlateTracker
+from utils import draw_plate_box, plate_quality
+from vehicle_map import VEHICLE_CLASSES
+
+
+def put_latest(q, item):
+    """
+    Put item without blocking; when q is full drop its oldest entry first.
+    Returns the dropped entry, or None.
+    """
+    dropped = None
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                dropped = q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def vehicle_label(detections, default="family_sedan"):
+    """
+    Type of the most confident vehicle in detect_vehicle dicts or detect_batch records.
+    """
+    if len(detections) == 0:
+        return default
+    best = max(detections, key=lambda d: d['confidence'])
+    return VEHICLE_CLASSES.get(int(best['class_id']), default)
+
+
+def ocr_worker(ocr_q, ocr_reader, batch_size):
+    """
+    OCR worker loop: reads (idx, track, crop, logic_q) items until None,
+    batching whatever is already queued, and posts each read to the item's
+    own logic_q. Several gates may share one ocr_q.
+    """
+    done = False
+    while not done:
+        item = ocr_q.get()
+        if item is None:
+            break
+
+        # take whatever else is already queued, up to one batch
+        batch = [item]
+        while len(batch) < batch_size:
+            try:
+                item = ocr_q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                done = True
+                break
+            batch.append(item)
+
+        if len(batch) == 1:
+            reads = [ocr_reader.read_text_scored(batch[0][2])]
+        else:
+            reads = ocr_reader.read_batch([crop for _, _, crop, _ in batch])
+        plates = normalize_many(raw_text for raw_text, _ in reads)
+        for (idx, track, _, logic_q), (raw_text, confidence), plate_text in zip(batch, reads, plates):
+            logic_q.put(("read", idx, track, raw_text, plate_text, confidence))
+
+
+class GatePipeline:
+    """
+    Staged gate loop: capture -> detection -> OCR worker pool -> gate logic,
+    each on its own thread(s) and linked by bounded queues. The caller's
+    thread only draws and shows frames.
+
+    Frames come from a LatestFrameCapture: live sources always hand the
+    newest frame to detection, files are read in full. The crop queue drops
+    its oldest entry when full, so slow OCR skips stale crops instead of
+    falling behind. OCR results are never dropped.
+    Plates are tracked across frames and OCR runs only until a track's plate
+    is stable (see PlateTracker); each track reaches on_plate at most once.
+    on_plate(plate_text, vehicle_label) runs on the single logic thread and may
+    return (text, color, scale, thickness) to overlay on the display.
+
+    With cascade=True (needs vehicle_detector) plates are searched only in
+    the lower part of each vehicle box and carry that vehicle's type; see
+    CascadeDetector.
+
+    An optional motion_gate (see MotionGate) is checked before detection;
+    while it reports the lane idle, frames skip the detectors and OCR.
+
+    MultiGateRunner drives several pipelines from shared detection and OCR
+    threads; it passes a shared ocr_q and display=False.
+
+    With detect_processes (a DetectionProcesses) detection runs in worker
+    processes that read frames from shared memory; plate_detector and
+    vehicle_detector are then unused. Results are put back in frame order
+    before tracking, so everything downstream behaves the same.
+    """
+
+    def __init__(self, source, plate_detector, ocr_reader, on_plate, vehicle_detector=None,
+                 ocr_workers=2, frame_queue_size=2, ocr_queue_size=8, debounce_frames=30,
+                 window_name="Gate", stats_interval=10.0, tracker=None, ocr_batch_size=4, cascade=False,
+                 motion_gate=None, ocr_q=None, display=True, detect_processes=None):
+        self.plate_detector = plate_detector
+        self.vehicle_detector = vehicle_detector
+        self.ocr_reader = ocr_reader
+        self.on_plate = on_plate
+        self.ocr_workers = ocr_workers
+        self.ocr_batch_size = ocr_batch_size
+        self.debounce_frames = debounce_frames
+        self.window_name = window_name
+        self.stats_interval = stats_interval
+        self.tracker = tracker or PlateTracker()
+        self.motion_gate = motion_gate
+        self.display = display
+        self.idle_frames = 0
+        self.cascade = None
+        if cascade:
+            if vehicle_detector is None:
+                raise ValueError("cascade mode needs a vehicle_detector")
+            self.cascade = cascade if isinstance(cascade, CascadeDetector) else \
+                CascadeDetector(plate_detector, vehicle_detector)
+
+        self.detect_processes = detect_processes
+        if detect_processes is not None and self.cascade is not None:
+            raise ValueError("cascade mode runs in-process only")
+        self._order = deque()    # frames handed to detect_processes, in capture order
+        self._order_lock = threading.Lock()
+        self._skipped = set()
+
+        self.cap = LatestFrameCapture(source, buffer_size=frame_queue_size, start=False)
+        self.display_q = queue.Queue(frame_queue_size)
+        self.ocr_q = ocr_q if ocr_q is not None else queue.Queue(ocr_queue_size)
+        self.logic_q = queue.Queue()
+        self.dropped = Counter()
+
+        self._lock = threading.Lock()
+        self._message = None   # (text, color, scale, thickness, until_frame_idx)
+        self._last_seen = {}
+
+    def stats(self):
+        """
+        Current depth of each queue and how many items each stage has dropped.
+        """
+        return {
+            "capture": self.cap.stats(),
+            "display": self.display_q.qsize(),
+            "ocr": self.ocr_q.qsize(),
+            "logic": self.logic_q.qsize(),
+            "dropped": dict(self.dropped),
+            "idle_frames": self.idle_frames,
+        }
+
+    def _vehicle_label(self, frame):
+        if self.vehicle_detector is None:
+            return "family_sedan"
+        try:
+            return vehicle_label(self.vehicle_detector.detect_vehicle(frame))
+        except Exception:
+            return "family_sedan"
+
+    def _detect(self):
+        idx = 0
+        while True:
+            item = self.cap.read()
+            if item is None:
+                break
+            idx, _, frame = item
+
+            if self.motion_gate is not None and not self.motion_gate.update(frame):
+                self._idle_frame(idx, frame)
+                continue
+
+            if self.cascade is not None:
+                label = "family_sedan"
+                try:
+                    detections = self.cascade.detect(frame)
+                except Exception as e:
+                    print("Cascade detector error:", e)
+                    detections = []
+            else:
+                label = self._vehicle_label(frame)
+                try:
+                    detections = self.plate_detector.detect(frame)
+                except Exception as e:
+                    print("Plate detector error:", e)
+                    detections = []
+
+            self._process_frame(idx, frame, detections, label)
+
+        self._end_detection(idx)
+
+    def _end_detection(self, idx):
+        self._flush_tracks(idx)
+        for _ in range(self.ocr_workers):
+            self.ocr_q.put(None)
+        put_latest(self.display_q, None)
+
+    def _feed(self):
+        # process mode, first half: capture -> motion gate -> shared-memory ring
+        pool = self.detect_processes
+        idx = 0
+        try:
+            while True:
+                item = self.cap.read()
+                if item is None:
+                    break
+                idx, timestamp, frame = item
+                if pool.ring is not None and not pool.alive():
+                    break
+                if self.motion_gate is not None and not self.motion_gate.update(frame):
+                    with self._order_lock:
+                        self._order.append(("idle", idx, frame))
+                    continue
+                with self._order_lock:
+                    self._order.append(("detect", idx, None))
+                if not self._submit(pool, frame, idx, timestamp):
+                    break
+        finally:
+            with self._order_lock:
+                self._order.append(("end", idx, None))
+            pool.stop()
+
+    def _submit(self, pool, frame, idx, timestamp):
+        # False if the workers have died and the frame could not be queued
+        while True:
+            try:
+                reused = pool.submit(frame, idx, timestamp, drop=self.cap.drop, timeout=1.0)
+                break
+            except queue.Empty:
+                if not pool.alive():
+                    with self._order_lock:
+                        self._skipped.add(idx)
+                    return False
+        if reused is not None:
+            with self._order_lock:
+                self._skipped.add(reused)
+            self.dropped["frames"] += 1
+        return True
+
+    def _collect(self):
+        # process mode, second half: worker results back in frame order -> tracking
+        pool = self.detect_processes
+        pending = {}
+        idx = 0
+        workers_lost = False
+        while True:
+            with self._order_lock:
+                head = self._order[0] if self._order else None
+                if head is not None and (head[0] != "detect" or head[1] in pending or head[1] in self._skipped
+                                         or workers_lost):
+                    self._order.popleft()
+                    self._skipped.discard(head[1])
+                else:
+                    head = None
+            if head is not None:
+                kind, idx, frame = head
+                if kind == "end":
+                    break
+                if kind == "idle":
+                    self._idle_frame(idx, frame)
+                elif idx in pending:
+                    msg, records, label = pending.pop(idx)
+                    view = pool.ring.view(msg)
+                    detections = [{'coords': coords_of(d), 'confidence': float(d['confidence'])} for d in records]
+                    # the display stage keeps the frame, the ring slot is reused
+                    self._process_frame(idx, view.copy() if self.display else view, detections,
+                                        label or "family_sedan")
+                    pool.ring.release(msg[0])
+                continue
+
+            if pool.results is None or workers_lost:
+                # _feed stops on dead workers too; wait for its end marker
+                time.sleep(0.01)
+                continue
+            try:
+                result = pool.get(timeout=0.05)
+            except queue.Empty:
+                if not pool.alive():
+                    print("Detection workers exited")
+                    workers_lost = True
+                continue
+            if result is not None:
+                pending[result[0][1]] = result
+
+        pool.close()
+        self._end_detection(idx)
+
+    def _show(self, idx, frame, matched):
+        if self.display and put_latest(self.display_q, (idx, frame, matched)) is not None:
+            self.dropped["display"] += 1
+
+    def _idle_frame(self, idx, frame):
+        # idle lane: no detection, but let tracks age out as usual
+        self.idle_frames += 1
+        _, expired = self.tracker.update([], idx)
+        for track in expired:
+            self._flush_track(track, idx)
+            self.logic_q.put(("expired", idx, track))
+        self._show(idx, frame, [])
+
+    def _process_frame(self, idx, frame, detections, label):
+        """
+        Track one frame's plate detections and queue OCR for tracks that are due.
+        """
+        matched, expired = self.tracker.update([det['coords'] for det in detections], idx)
+        for track in expired:
+            self._flush_track(track, idx)
+            self.logic_q.put(("expired", idx, track))
+
+        for det, (coords, track) in zip(detections, matched):
+            track.vehicle_label = det.get('vehicle_label', label)
+            if self.tracker.settled(track):
+                continue
+            x1, y1, x2, y2 = coords
+            crop = frame[y1:y2, x1:x2]
+            if crop is None or crop.size == 0:
+                continue
+            self.tracker.offer(track, crop, plate_quality(crop))
+            best = self.tracker.take_best(track, idx)
+            if best is None:
+                continue
+            dropped = put_latest(self.ocr_q, (idx, track, best, self.logic_q))
+            if dropped is not None:
+                self.dropped["ocr"] += 1
+                # that read will never arrive; tell the dropped crop's own lane
+                _, dropped_track, _, dropped_logic_q = dropped
+                dropped_logic_q.put(("dropped", idx, dropped_track))
+
+        self._show(idx, frame, matched)
+
+    def _flush_tracks(self, idx):
+        for track in list(self.tracker.tracks.values()):
+            self._flush_track(track, idx)
+
+    def _flush_track(self, track, idx):
+        # a track is ending: read its best buffered crop now, without dropping it
+        best = self.tracker.take_best(track, idx, force=True)
+        if best is not None:
+            self.ocr_q.put((idx, track, best, self.logic_q))
+
+    def _ocr(self):
+        ocr_worker(self.ocr_q, self.ocr_reader, self.ocr_batch_size)
+        self.logic_q.put(None)
+
+    def _logic(self):
+        finished = 0
+        idx = 0
+        while finished < self.ocr_workers:
+            item = self.logic_q.get()
+            if item is None:
+                finished += 1
+                continue
+
+            kind, idx, track = item[:3]
+            if kind == "read":
+                raw_text, plate_text, confidence = item[3:]
+                if raw_text is None:
+                    print("BAD OCR → None")
+                elif not plate_text:
+                    print("BAD OCR →", raw_text)
+                if self.tracker.add_read(track, raw_text, plate_text, confidence):
+                    self._report(track, idx)
+                elif track.expired and not track.reported and self.tracker.finalize(track):
+                    self._report(track, idx)
+            elif kind == "dropped":
+                self.tracker.cancel_read(track)
+                if track.expired and not track.reported and self.tracker.finalize(track):
+                    self._report(track, idx)
+            elif (not track.reported and not self.tracker.in_flight(track, idx)
+                  and self.tracker.finalize(track)):
+                # with a read still in flight, the "read" branch settles it instead
+                self._report(track, idx)
+
+        # end of stream: settle tracks that never reached a stable read
+        for track in self.tracker.flush():
+            if not track.reported and self.tracker.finalize(track):
+                self._report(track, idx)
+
+    def _report(self, track, idx):
+        track.reported = True
+        plate_text = track.plate
+
+        last = self._last_seen.get(plate_text, -999)
+        if idx - last <= self.debounce_frames:
+            return
+        self._last_seen[plate_text] = idx
+
+        try:
+            message = self.on_plate(plate_text, track.vehicle_label)
+        except Exception as e:
+            print("Gate logic error:", e)
+            message = None
+        if message:
+            with self._lock:
+                self._message = tuple(message) + (idx + self.debounce_frames,)
+
+    def draw(self, idx, frame, matched):
+        """
+        Draw tracked plates and the current gate message on frame.
+        """
+        for coords, track in matched:
+            frame = draw_plate_box(frame, coords, track.label())
+        with self._lock:
+            message = self._message
+        if message and idx <= message[4]:
+            text, color, scale, thickness = message[:4]
+            cv2.putText(frame, text, (50, 60), cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        return frame
+
+    def run(self):
+        self.cap.start()
+        if self.detect_processes is not None:
+            threads = [threading.Thread(target=self._feed, daemon=True),
+                       threading.Thread(target=self._collect, daemon=True)]
+        else:
+            threads = [threading.Thread(target=self._detect, daemon=True)]
+        threads.append(threading.Thread(target=self._logic, daemon=True))
+        threads += [threading.Thread(target=self._ocr, daemon=True) for _ in range(self.ocr_workers)]
+        for t in threads:
+            t.start()
+
+        next_stats = time.monotonic() + self.stats_interval
+        try:
+            while True:
+                item = self.display_q.get()
+                if item is None:
+                    break
+                cv2.imshow(self.window_name, self.draw(*item))
+                if cv2.waitKey(1) == 27:
+                    break
+
+                if self.stats_interval and time.monotonic() >= next_stats:
+                    print("Pipeline:", self.stats())
+                    next_stats = time.monotonic() + self.stats_interval
+        finally:
+            self.cap.release()
+            # let in-flight plates reach the gate logic before returning
+            for t in threads:
+                t.join()
+            if self.display:
+                cv2.destroyAllWindows()
@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread that batches submitted write events into one
+    transaction every interval_ms or batch_size events, whichever comes first.
+    Each event runs inside its own SAVEPOINT so one failure does not abort
+    the rest of the batch. Futures resolve only after the COMMIT.
+    """
+
+    def __init__(self, conn, interval_ms=20, batch_size=64, on_rollback=None):
+        self.conn = conn
+        self.interval = interval_ms / 1000.0
+        self.batch_size = batch_size
+        self.on_rollback = on_rollback
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def owns_current_thread(self):
+        return threading.get_ident() == self._thread.ident
+
+    def submit(self, fn, *args):
+        """
+        Queue fn(*args) for the next batch. Returns a Future with its result.
+        """
+        fut = Future()
+        self._queue.put((fn, args, fut))
+        return fut
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        done = []
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for fn, args, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                self.conn.execute("SAVEPOINT event")
+                try:
+                    result = fn(*args)
+                except Exception as e:
+                    self.conn.execute("ROLLBACK TO event")
+                    self.conn.execute("RELEASE event")
+                    if self.on_rollback:
+                        self.on_rollback()
+                    fut.set_exception(e)
+                    continue
+                self.conn.execute("RELEASE event")
+                done.append((fut, result))
+            self.conn.commit()
+        except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            if self.on_rollback:
+                self.on_rollback()
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for fut, result in done:
+            fut.set_result(result)
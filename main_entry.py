@@ -1,123 +1,76 @@
-import cv2
-import pyttsx3
 from detector import PlateDetector
 from vehicle_detector import VehicleDetector
-from vehicle_map import VEHICLE_CLASSES
 from ocr_reader import LPROCR
-from parking_logic import handle_entry
-from normalize_plate import normalize_plate
-from utils import draw_plate_box
+from gate_pipeline import GatePipeline
+from motion_gate import MotionGate
+from detect_processes import DetectionProcesses
 
 PLATE_MODEL = "models/platebest.pt"
 VEHICLE_MODEL = "models/best.pt"
 VIDEO_SOURCE = "/Users/harshlohia/Downloads/IMG_2895.jpg"
-
-plate_detector = PlateDetector(PLATE_MODEL)
-vehicle_detector = VehicleDetector(VEHICLE_MODEL)
-ocr_reader = LPROCR()
-speaker = pyttsx3.init()
-
-cap = cv2.VideoCapture(VIDEO_SOURCE)
-if not cap.isOpened():
-    print("Cannot open video source:", VIDEO_SOURCE)
-    raise SystemExit(1)
-
-print("Entry gate started...")
-
-last_seen = {}
+OCR_WORKERS = 2
 FRAME_DEBOUNCE = 30
-frame_idx = 0
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    h, w = frame.shape[:2]
-
-
-    vehicle_label = "family_sedan"
-    try:
-        detections_v = vehicle_detector.detect_vehicle(frame)
-        if detections_v:
-            best = max(detections_v, key=lambda x: x['confidence'])
-            vehicle_label = VEHICLE_CLASSES.get(best['class_id'], "family_sedan")
-    except:
-        pass
+CASCADE = False   # plates only inside vehicle boxes, typed per vehicle
+MOTION_ROI = None   # lane polygon [(x, y), ...] in frame pixels; None = whole frame
+OCR_PREPROCESS = "clahe"   # or "threshold", see plate_preprocess.py
+MODEL_BACKEND = "torch"   # "torch", "onnx" or "openvino"; exports are cached next to the .pt
+MODEL_INT8 = False         # onnx/openvino only, each model calibrated on its own dataset below
+PLATE_CALIBRATION_DATA = "plate_data.yaml"
+VEHICLE_CALIBRATION_DATA = "data.yaml"
+DETECT_PROCESSES = 0       # >0: run detection in that many worker processes over shared memory
 
 
+def on_plate(plate_text, vehicle_label):
     try:
-        detections = plate_detector.detect(frame)
+        result = handle_entry(plate_text, vehicle_label)
     except Exception as e:
-        print("Plate detector error:", e)
-        detections = []
-
-    for det in detections:
-        x1, y1, x2, y2 = det['coords']
-
-        crop = frame[y1:y2, x1:x2]
-
-        if crop is None or crop.size == 0:
-            continue
-
-
-        raw_text = ocr_reader.read_text(crop)
-
-        if raw_text is None:
-            print("BAD OCR → None")
-            frame = draw_plate_box(frame, (x1, y1, x2, y2), "")
-            continue
-
-
-        plate_text = normalize_plate(raw_text)
-
-        if not plate_text:
-            print("BAD OCR →", raw_text)
-            frame = draw_plate_box(frame, (x1, y1, x2, y2), raw_text)
-            continue
-
-
-        last = last_seen.get(plate_text, -999)
-        if frame_idx - last <= FRAME_DEBOUNCE:
-            frame = draw_plate_box(frame, (x1, y1, x2, y2), plate_text)
-            continue
-
-        last_seen[plate_text] = frame_idx
-
-
-        try:
-            result = handle_entry(plate_text, vehicle_label)
-        except Exception as e:
-            print("handle_entry error:", e)
-            result = {"status": "error", "message": "internal"}
-
-        print("ENTRY:", plate_text, vehicle_label, result)
-
-
-        if result.get("status") == "ok":
-            slot = result.get("slot")
-            cv2.putText(frame, f"SLOT: {slot}", (50, 60),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
-
-            try:
-                speaker.say(f"Please proceed to slot {slot}")
-                speaker.runAndWait()
-            except:
-                pass
-
-        elif result.get("status") == "exists":
-            slot = result.get("slot")
-            cv2.putText(frame, f"ALREADY IN: {slot}", (50, 60),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 200, 255), 2)
-
-        frame = draw_plate_box(frame, (x1, y1, x2, y2), plate_text)
-
-
-    cv2.imshow("Entry Gate", frame)
-    if cv2.waitKey(1) == 27:
-        break
-
-    frame_idx += 1
-
-cap.release()
-cv2.destroyAllWindows()
+        print("handle_entry error:", e)
+        result = {"status": "error", "message": "internal"}
+
+    print("ENTRY:", plate_text, vehicle_label, result)
+
+
+    if result.get("status") == "ok":
+        slot = result.get("slot")
+        speaker.say(f"Please proceed to slot {slot}")
+        return f"SLOT: {slot}", (0, 255, 255), 1.2, 3
+
+    elif result.get("status") == "exists":
+        slot = result.get("slot")
+        return f"ALREADY IN: {slot}", (0, 200, 255), 1.0, 2
+
+    return None
+
+
+# detection worker processes re-import this module, so only the main process
+# opens the database, the speaker and (without DETECT_PROCESSES) the models
+if __name__ == "__main__":
+    from parking_logic import handle_entry
+    from announcer import Announcer
+
+    if DETECT_PROCESSES:
+        plate_detector = vehicle_detector = None
+        detect_processes = DetectionProcesses(PLATE_MODEL, VEHICLE_MODEL, MODEL_BACKEND, int8=MODEL_INT8,
+                                              processes=DETECT_PROCESSES, calibration=PLATE_CALIBRATION_DATA,
+                                              vehicle_calibration=VEHICLE_CALIBRATION_DATA)
+    else:
+        plate_detector = PlateDetector(PLATE_MODEL, MODEL_BACKEND, int8=MODEL_INT8,
+                                       calibration=PLATE_CALIBRATION_DATA)
+        vehicle_detector = VehicleDetector(VEHICLE_MODEL, MODEL_BACKEND, int8=MODEL_INT8,
+                                           calibration=VEHICLE_CALIBRATION_DATA)
+        detect_processes = None
+    ocr_reader = LPROCR(preprocess=OCR_PREPROCESS)
+    speaker = Announcer()
+
+    pipeline = GatePipeline(VIDEO_SOURCE, plate_detector, ocr_reader, on_plate,
+                            vehicle_detector=vehicle_detector, ocr_workers=OCR_WORKERS,
+                            debounce_frames=FRAME_DEBOUNCE, window_name="Entry Gate",
+                            cascade=CASCADE, motion_gate=MotionGate(roi=MOTION_ROI),
+                            detect_processes=detect_processes)
+    if not pipeline.cap.isOpened():
+        print("Cannot open video source:", VIDEO_SOURCE)
+        raise SystemExit(1)
+
+    print("Entry gate started...")
+    pipeline.run()
+    speaker.close()
@@ -1,95 +1,57 @@
-import cv2
-import pyttsx3
 from detector import PlateDetector
 from ocr_reader import LPROCR
-from parking_logic import handle_exit
-from normalize_plate import normalize_plate
-from utils import draw_plate_box
+from gate_pipeline import GatePipeline
+from motion_gate import MotionGate
+from detect_processes import DetectionProcesses
 
 
 
 PLATE_MODEL = "models/platebest.pt"
 LPR_MODEL = "models/best.pt"
 VIDEO_SOURCE = "/Users/harshlohia/Downloads/IMG_2894.jpg"
-
-plate_detector = PlateDetector(PLATE_MODEL)
-ocr_reader = LPROCR(LPR_MODEL)
-speaker = pyttsx3.init()
-
-cap = cv2.VideoCapture(VIDEO_SOURCE)
-print("Exit gate started...")
-
-last_seen = {}
+OCR_WORKERS = 2
 FRAME_DEBOUNCE = 30
-frame_idx = 0
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    h, w = frame.shape[:2]
-
-    try:
-        detections = plate_detector.detect(frame)
-    except Exception as e:
-        print("Plate detector error:", e)
-        detections = []
-
-    for det in detections:
-        x1, y1, x2, y2 = det["coords"]
-
-
-        crop = frame[y1:y2, x1:x2]
-
-        if crop is None or crop.size == 0:
-            continue
-
-
-        raw_text = ocr_reader.read_text(crop)
-
-        if raw_text is None:
-            print("BAD OCR → None")
-            frame = draw_plate_box(frame, (x1, y1, x2, y2), "")
-            continue
-
-
-        plate_text = normalize_plate(raw_text)
-
-        if not plate_text:
-            print("BAD NORMALIZED →", raw_text)
-            frame = draw_plate_box(frame, (x1, y1, x2, y2), raw_text)
-            continue
-
-
-        last = last_seen.get(plate_text, -999)
-        if frame_idx - last <= FRAME_DEBOUNCE:
-            frame = draw_plate_box(frame, (x1, y1, x2, y2), plate_text)
-            continue
-        last_seen[plate_text] = frame_idx
-
-
-        res = handle_exit(plate_text)
-        print("EXIT:", plate_text, res)
-
-        if res.get("status") == "ok":
-            slot = res.get("slot_released")
-            if slot:
-                cv2.putText(frame, f"SLOT FREE: {slot}", (50, 60),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-                try:
-                    speaker.say(f"Slot {slot} is now freed. Thank you.")
-                    speaker.runAndWait()
-                except:
-                    pass
-
-        frame = draw_plate_box(frame, (x1, y1, x2, y2), plate_text)
-
-    cv2.imshow("Exit Gate", frame)
-    if cv2.waitKey(1) == 27:
-        break
-
-    frame_idx += 1
-
-cap.release()
-cv2.destroyAllWindows()
+MOTION_ROI = None   # lane polygon [(x, y), ...] in frame pixels; None = whole frame
+OCR_PREPROCESS = "clahe"   # or "threshold", see plate_preprocess.py
+MODEL_BACKEND = "torch"   # "torch", "onnx" or "openvino"; exports are cached next to the .pt
+MODEL_INT8 = False         # onnx/openvino only, calibrated on PLATE_CALIBRATION_DATA
+PLATE_CALIBRATION_DATA = "plate_data.yaml"
+DETECT_PROCESSES = 0       # >0: run detection in that many worker processes over shared memory
+
+
+def on_plate(plate_text, vehicle_label):
+    res = handle_exit(plate_text)
+    print("EXIT:", plate_text, res)
+
+    if res.get("status") == "ok":
+        slot = res.get("slot_released")
+        if slot:
+            speaker.say(f"Slot {slot} is now freed. Thank you.")
+            return f"SLOT FREE: {slot}", (0, 255, 0), 1.2, 3
+
+    return None
+
+
+# detection worker processes re-import this module, so only the main process
+# opens the database, the speaker and (without DETECT_PROCESSES) the models
+if __name__ == "__main__":
+    from parking_logic import handle_exit
+    from announcer import Announcer
+
+    if DETECT_PROCESSES:
+        plate_detector = None
+        detect_processes = DetectionProcesses(PLATE_MODEL, backend=MODEL_BACKEND, int8=MODEL_INT8,
+                                              processes=DETECT_PROCESSES, calibration=PLATE_CALIBRATION_DATA)
+    else:
+        plate_detector = PlateDetector(PLATE_MODEL, MODEL_BACKEND, int8=MODEL_INT8, calibration=PLATE_CALIBRATION_DATA)
+        detect_processes = None
+    ocr_reader = LPROCR(LPR_MODEL, preprocess=OCR_PREPROCESS)
+    speaker = Announcer()
+
+    pipeline = GatePipeline(VIDEO_SOURCE, plate_detector, ocr_reader, on_plate,
+                            ocr_workers=OCR_WORKERS, debounce_frames=FRAME_DEBOUNCE,
+                            motion_gate=MotionGate(roi=MOTION_ROI), window_name="Exit Gate",
+                            detect_processes=detect_processes)
+    print("Exit gate started...")
+    pipeline.run()
+    speaker.close()
@@ -0,0 +1,62 @@
+from detector import PlateDetector
+from vehicle_detector import VehicleDetector
+from ocr_reader import LPROCR
+from parking_logic import handle_entry, handle_exit
+from multi_gate import MultiGateRunner
+from announcer import Announcer
+
+PLATE_MODEL = "models/platebest.pt"
+VEHICLE_MODEL = "models/best.pt"
+MODEL_BACKEND = "torch"   # "torch", "onnx" or "openvino"; exports are cached next to the .pt
+OCR_WORKERS = 2
+CASCADE = False
+SHOW = True
+
+# one entry per lane; "roi" is the motion-gate lane polygon in frame pixels
+CAMERAS = [
+    {"name": "Entry Gate", "source": 0, "role": "entry", "roi": None},
+    {"name": "Exit Gate", "source": "rtsp://192.168.1.20:554/stream1", "role": "exit", "roi": None},
+]
+
+plate_detector = PlateDetector(PLATE_MODEL, MODEL_BACKEND)
+vehicle_detector = VehicleDetector(VEHICLE_MODEL, MODEL_BACKEND)
+ocr_reader = LPROCR()
+speaker = Announcer()
+
+
+def on_entry(camera, plate_text, vehicle_label):
+    try:
+        result = handle_entry(plate_text, vehicle_label)
+    except Exception as e:
+        print("handle_entry error:", e)
+        result = {"status": "error", "message": "internal"}
+
+    print(f"ENTRY [{camera}]:", plate_text, vehicle_label, result)
+
+    if result.get("status") == "ok":
+        slot = result.get("slot")
+        speaker.say(f"Please proceed to slot {slot}")
+        return f"SLOT: {slot}", (0, 255, 255), 1.2, 3
+    elif result.get("status") == "exists":
+        return f"ALREADY IN: {result.get('slot')}", (0, 200, 255), 1.0, 2
+    return None
+
+
+def on_exit(camera, plate_text, vehicle_label):
+    res = handle_exit(plate_text)
+    print(f"EXIT [{camera}]:", plate_text, res)
+
+    if res.get("status") == "ok":
+        slot = res.get("slot_released")
+        if slot:
+            speaker.say(f"Slot {slot} is now freed. Thank you.")
+            return f"SLOT FREE: {slot}", (0, 255, 0), 1.2, 3
+    return None
+
+
+runner = MultiGateRunner(CAMERAS, plate_detector, ocr_reader, {"entry": on_entry, "exit": on_exit},
+                         vehicle_detector=vehicle_detector, ocr_workers=OCR_WORKERS,
+                         cascade=CASCADE, show=SHOW)
+print(f"Running {len(CAMERAS)} gates...")
+runner.run()
+speaker.close()
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap motion check run in front of the detectors, so idle gates skip
+    the YOLO and OCR passes. Each frame is downscaled to width pixels and
+    converted to gray; it is compared against a running-average background,
+    and the share of changed pixels inside the ROI is measured.
+
+    roi is a polygon [(x, y), ...] in full-frame pixels (None = whole frame).
+    Hysteresis: the gate opens after on_frames consecutive frames with at
+    least min_fraction of the ROI changed and closes after off_frames
+    consecutive still frames, so a car pausing at the barrier keeps it open.
+    The gate starts open, so the first frames (or a single still image) are
+    always checked.
+    """
+
+    def __init__(self, roi=None, width=160, threshold=25, min_fraction=0.01, on_frames=2, off_frames=45,
+                 learning_rate=0.05):
+        self.roi = roi
+        self.width = width
+        self.threshold = threshold
+        self.min_fraction = min_fraction
+        self.on_frames = on_frames
+        self.off_frames = off_frames
+        self.learning_rate = learning_rate
+        self.active = True
+        self.last_fraction = 0.0
+        self._streak = 0
+        self._shape = None
+
+    def _setup(self, frame):
+        h, w = frame.shape[:2]
+        sh = max(1, round(h * self.width / w))
+        self._shape = (h, w)
+        self._size = (self.width, sh)
+        self._small = np.empty((sh, self.width) + frame.shape[2:], np.uint8)
+        self._gray = np.empty((sh, self.width), np.uint8)
+        self._background = None
+        self._bg8 = np.empty((sh, self.width), np.uint8)
+        self._diff = np.empty((sh, self.width), np.uint8)
+        self._mask = np.zeros((sh, self.width), np.uint8)
+        if self.roi is None:
+            self._mask[:] = 255
+        else:
+            pts = np.asarray(self.roi, np.float32) * (self.width / w)
+            cv2.fillPoly(self._mask, [pts.round().astype(np.int32)], 255)
+        self._roi_pixels = max(1, cv2.countNonZero(self._mask))
+
+    def reset(self):
+        self._shape = None
+        self.active = True
+        self._streak = 0
+
+    def update(self, frame):
+        """
+        Feed one frame; returns True while the detectors should run.
+        """
+        if self._shape != frame.shape[:2]:
+            self._setup(frame)
+
+        cv2.resize(frame, self._size, dst=self._small, interpolation=cv2.INTER_AREA)
+        if self._small.ndim == 3:
+            cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        else:
+            self._gray[:] = self._small
+        cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+
+        if self._background is None:
+            self._background = self._gray.astype(np.float32)
+            moving = True
+        else:
+            cv2.convertScaleAbs(self._background, dst=self._bg8)
+            cv2.absdiff(self._gray, self._bg8, dst=self._diff)
+            cv2.threshold(self._diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+            cv2.bitwise_and(self._diff, self._mask, dst=self._diff)
+            self.last_fraction = cv2.countNonZero(self._diff) / self._roi_pixels
+            moving = self.last_fraction >= self.min_fraction
+            cv2.accumulateWeighted(self._gray, self._background, self.learning_rate)
+
+        if moving != self.active:
+            self._streak += 1
+            if self._streak >= (self.on_frames if moving else self.off_frames):
+                self.active = moving
+                self._streak = 0
+        else:
+            self._streak = 0
+        return self.active
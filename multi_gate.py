@@ -0,0 +1,177 @@
+import functools
+import queue
+import threading
+import time
+
+import cv2
+
+from cascade import CascadeDetector
+from detector import coords_of
+from gate_pipeline import GatePipeline, ocr_worker, put_latest, vehicle_label
+from motion_gate import MotionGate
+
+ROLES = ("entry", "exit")
+
+
+class MultiGateRunner:
+    """
+    Runs several gate cameras in one process with one set of models.
+
+    cameras is a list of {"name", "source", "role": "entry"|"exit"} dicts,
+    optionally with "roi" (motion gate polygon, see MotionGate) and
+    "motion": False to detect on every frame. handlers maps each role to
+    on_plate(camera_name, plate_text, vehicle_label), which is called like
+    GatePipeline's on_plate.
+
+    Every camera is a GatePipeline lane with its own reader thread, tracker
+    and gate-logic thread. Detection runs on a single thread that takes the
+    newest frame from every lane and passes them through each model in one
+    batched call. The vehicle model only sees entry lanes, unless cascade
+    mode needs vehicle boxes everywhere. OCR crops from all lanes share one
+    queue and one worker pool, so read_batch batches across cameras too.
+    """
+
+    def __init__(self, cameras, plate_detector, ocr_reader, handlers, vehicle_detector=None,
+                 ocr_workers=2, ocr_queue_size=16, ocr_batch_size=8, cascade=False, show=False,
+                 stats_interval=30.0, **lane_kwargs):
+        self.plate_detector = plate_detector
+        self.vehicle_detector = vehicle_detector
+        self.ocr_reader = ocr_reader
+        self.ocr_workers = ocr_workers
+        self.ocr_batch_size = ocr_batch_size
+        self.show = show
+        self.stats_interval = stats_interval
+        self.ocr_q = queue.Queue(ocr_queue_size)
+        self.cascade = None
+        if cascade:
+            if vehicle_detector is None:
+                raise ValueError("cascade mode needs a vehicle_detector")
+            self.cascade = CascadeDetector(plate_detector, vehicle_detector)
+
+        self.lanes = []
+        for cam in cameras:
+            role = cam.get("role")
+            if role not in ROLES:
+                raise ValueError(f"camera {cam.get('name')!r}: role must be one of {ROLES}")
+            name = cam.get("name") or f"{role}-{len(self.lanes) + 1}"
+            gate = MotionGate(roi=cam.get("roi")) if cam.get("motion", True) else None
+            lane = GatePipeline(cam["source"], plate_detector, ocr_reader,
+                                functools.partial(handlers[role], name),
+                                vehicle_detector=vehicle_detector if role == "entry" else None,
+                                ocr_workers=1, frame_queue_size=1, window_name=name,
+                                motion_gate=gate, ocr_q=self.ocr_q, display=show, **lane_kwargs)
+            lane.name, lane.role = name, role
+            if not lane.cap.isOpened():
+                print(f"Cannot open camera {name}: {cam['source']}")
+            self.lanes.append(lane)
+
+    def stats(self):
+        return {lane.name: lane.stats() for lane in self.lanes}
+
+    def _infer(self, batch):
+        """
+        (detections, vehicle_label) for each (lane, idx, frame) in batch, one
+        forward pass per model for the whole batch.
+        """
+        frames = [frame for _, _, frame in batch]
+        default = "family_sedan"
+        try:
+            if self.cascade is not None:
+                return [(dets, default) for dets in self.cascade.detect_batch(frames)]
+
+            plates = self.plate_detector.detect_batch(frames)
+            labels = [default] * len(batch)
+            entry = [i for i, (lane, _, _) in enumerate(batch) if lane.vehicle_detector is not None]
+            if entry:
+                for i, vehicles in zip(entry, self.vehicle_detector.detect_batch([frames[i] for i in entry])):
+                    labels[i] = vehicle_label(vehicles, default)
+            return [([{'coords': coords_of(d), 'confidence': float(d['confidence'])} for d in found], label)
+                    for found, label in zip(plates, labels)]
+        except Exception as e:
+            print("Detector error:", e)
+            return [([], default)] * len(batch)
+
+    def _detect(self):
+        live = list(self.lanes)
+        last_idx = {}
+        while live:
+            batch = []
+            for lane in list(live):
+                item = lane.cap.read(timeout=0)
+                if item is None:
+                    if lane.cap.exhausted():
+                        live.remove(lane)
+                        lane._flush_tracks(last_idx.get(lane.name, 0))
+                        put_latest(lane.display_q, None)
+                    continue
+                idx, _, frame = item
+                last_idx[lane.name] = idx
+                if lane.motion_gate is not None and not lane.motion_gate.update(frame):
+                    lane._idle_frame(idx, frame)
+                    continue
+                batch.append((lane, idx, frame))
+
+            if not batch:
+                time.sleep(0.002)
+                continue
+            for (lane, idx, frame), (detections, label) in zip(batch, self._infer(batch)):
+                lane._process_frame(idx, frame, detections, label)
+
+        for _ in range(self.ocr_workers):
+            self.ocr_q.put(None)
+
+    def _display(self, detect_thread):
+        """
+        Show every lane's frames until the lanes end; True if ESC was pressed.
+        """
+        live = {lane.name: lane for lane in self.lanes}
+        while live and detect_thread.is_alive():
+            shown = False
+            for name, lane in list(live.items()):
+                try:
+                    item = lane.display_q.get_nowait()
+                except queue.Empty:
+                    continue
+                if item is None:
+                    del live[name]
+                    continue
+                cv2.imshow(lane.window_name, lane.draw(*item))
+                shown = True
+            if cv2.waitKey(1 if shown else 10) == 27:
+                return True
+        return False
+
+    def run(self):
+        detect = threading.Thread(target=self._detect, daemon=True)
+        workers = [threading.Thread(target=ocr_worker, args=(self.ocr_q, self.ocr_reader, self.ocr_batch_size),
+                                    daemon=True) for _ in range(self.ocr_workers)]
+        logic = [threading.Thread(target=lane._logic, daemon=True) for lane in self.lanes]
+        for lane in self.lanes:
+            lane.cap.start()
+        for t in [detect] + workers + logic:
+            t.start()
+
+        next_stats = time.monotonic() + self.stats_interval
+        try:
+            if self.show and self._display(detect):
+                return  # the finally block stops every camera
+            while detect.is_alive():
+                detect.join(timeout=1.0)
+                if self.stats_interval and time.monotonic() >= next_stats:
+                    print("Gates:", self.stats())
+                    next_stats = time.monotonic() + self.stats_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for lane in self.lanes:
+                lane.cap.release()
+            # let in-flight plates reach the gate logic before returning
+            detect.join()
+            for t in workers:
+                t.join()
+            for lane in self.lanes:
+                lane.logic_q.put(None)
+            for t in logic:
+                t.join()
+            if self.show:
+                cv2.destroyAllWindows()
@@ -1,41 +1,186 @@
+import functools
+import itertools
 import re
 
+from plate_index import CONFUSION_GROUPS
+
+LETTER, DIGIT = "L", "D"
+
+# Each format is (name, segments). A segment is a literal string such as "BH"
+# or (LETTER|DIGIT, count), (LETTER|DIGIT, min, max) or
+# (LETTER|DIGIT, min, max, preferred) for a length that is usual but not the only one.
+PATTERN_PACKS = {
+    # MH12AB1234, DL3CAF5030
+    "india": (("state", ((LETTER, 2), (DIGIT, 1, 2, 2), (LETTER, 1, 3, 2), (DIGIT, 4))),),
+    # 22BH1234AA
+    "bh": (("bh", ((DIGIT, 2), "BH", (DIGIT, 4), (LETTER, 1, 2))),),
+    # T0125MH1234AB: month/year, state, number, series
+    "temporary": (("temporary", ("T", (DIGIT, 4), (LETTER, 2), (DIGIT, 4), (LETTER, 1, 2))),),
+}
+DEFAULT_PACKS = ("india", "bh")
+
+# OCR confusions, folded towards the class each position expects
+TO_DIGIT = str.maketrans({c: group[0] for group in CONFUSION_GROUPS for c in group[1:]})
+TO_LETTER = str.maketrans({group[0]: group[1] for group in CONFUSION_GROUPS})
+
+# ranking cost of a segment away from its preferred length, in corrections:
+# a 1-digit district only wins over a 2-digit one that needs two corrections
+OFF_LENGTH_COST = 1.5
+# a read needing more corrections than this is not taken for that format
+MAX_CORRECTIONS = 3
+# ranking cost of each character left out as stray (plate border, bolt, ...)
+DROPPED_COST = 1.0
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]")
+# country code from the plate's hologram strip, often read along with the number
+_PREFIX = re.compile(r"^IND(?=.{9})")
+
+
+def register_pack(name, formats):
+    """
+    Add or replace a pattern pack; formats are (name, segments) as in PATTERN_PACKS.
+    """
+    PATTERN_PACKS[name] = tuple(formats)
+    _compile.cache_clear()
+    _cached.cache_clear()
 
-def normalize_plate(text):
-    if not text:
-        return None
 
+class _Format:
+    """
+    One plate format: its segments and every split of a read into them,
+    keyed by read length.
+    """
 
-    text = re.sub(r'[^A-Za-z0-9]', '', text).upper()
+    def __init__(self, segments):
+        self.segments = []   # (literal or None, table, check, lo, hi, preferred)
+        for seg in segments:
+            if isinstance(seg, str):
+                self.segments.append((seg, TO_LETTER, None, len(seg), len(seg), None))
+                continue
+            kind, lo = seg[0], seg[1]
+            hi = seg[2] if len(seg) > 2 else lo
+            preferred = seg[3] if len(seg) > 3 else None
+            table, check = (TO_LETTER, str.isalpha) if kind == LETTER else (TO_DIGIT, str.isdigit)
+            self.segments.append((None, table, check, lo, hi, preferred))
 
+        # reads shorter than this are only taken as they are, never corrected
+        self.canonical = sum(s[5] or s[3] for s in self.segments)
+        self.splits = {}
+        for lengths in itertools.product(*(range(s[3], s[4] + 1) for s in self.segments)):
+            penalty = sum(OFF_LENGTH_COST for s, n in zip(self.segments, lengths) if s[5] and n != s[5])
+            self.splits.setdefault(sum(lengths), []).append((penalty, lengths))
 
-    text = (text.replace('I', '1')
-            .replace('O', '0')
-            .replace('Z', '2')
-            .replace('S', '5')
-            .replace('B', '8'))
+        exact = []
+        for literal, _, check, lo, hi, preferred in self.segments:
+            if literal is not None:
+                exact.append(re.escape(literal))
+            else:
+                count = preferred or (f"{lo}" if lo == hi else f"{lo},{hi}")
+                exact.append(f"[{'A-Z' if check is str.isalpha else '0-9'}]{{{count}}}")
+        self.exact = "".join(exact)
 
+    def fit(self, text):
+        """
+        (cost, plate) for the cheapest split of text, or None.
+        """
+        best = None
+        for penalty, lengths in self.splits.get(len(text), ()):
+            if best is not None and penalty >= best[0]:
+                continue
+            pos, parts, corrections = 0, [], 0
+            for (literal, table, check, *_), n in zip(self.segments, lengths):
+                part = text[pos:pos + n]
+                pos += n
+                fixed = part.translate(table)
+                if fixed != literal if literal is not None else not check(fixed):
+                    break
+                if fixed != part:
+                    corrections += sum(a != b for a, b in zip(part, fixed))
+                    if corrections > MAX_CORRECTIONS:
+                        break
+                parts.append(fixed)
+            else:
+                if corrections and len(text) < self.canonical:
+                    continue
+                cost = corrections + penalty
+                if best is None or cost < best[0]:
+                    best = cost, "".join(parts)
+        return best
 
-    pattern = r'([A-Z]{2})(\d{2})([A-Z]{1,2})(\d{4})'
-    match = re.search(pattern, text)
-    if match:
-        return "".join(match.groups())
 
+class _Normalizer:
+    """
+    The formats of a set of packs, compiled once. Reads already in canonical
+    form match one precompiled alternation. Anything else is tried, whole and
+    with stray characters cut from either end, against every split of every
+    format. The cheapest candidate wins: one per correction, OFF_LENGTH_COST
+    per segment off its preferred length, DROPPED_COST per character cut.
+    Longer candidates and then the first format listed win ties.
+    """
 
-    letters = ''.join(re.findall(r'[A-Z]', text))
-    digits = ''.join(re.findall(r'\d', text))
+    def __init__(self, packs):
+        self.formats = [_Format(segs) for pack in packs for _, segs in PATTERN_PACKS[pack]]
+        self.exact = re.compile("|".join(fmt.exact for fmt in self.formats))
+        self.lengths = sorted({n for fmt in self.formats for n in fmt.splits}, reverse=True)
 
+    def _best(self, text):
+        best = None
+        for fmt in self.formats:
+            found = fmt.fit(text)
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found
+        return best
 
-    if len(letters) >= 3 and len(digits) >= 6:
+    def __call__(self, text):
+        if not text:
+            return None
+        text = _PREFIX.sub("", _NON_ALNUM.sub("", text.upper()))
 
-        candidates = [
-            letters[:2] + digits[:2] + letters[2:4] + digits[2:],
-            letters[:2] + digits[:2] + letters[2:] + digits[2:],
-            digits[:2] + letters[:2] + digits[2:4] + letters[2:],  #
-        ]
-        for cand in candidates:
-            if re.match(r'^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$', cand):
-                return cand
+        if self.exact.fullmatch(text):
+            return text
+        best = self._best(text)
+        for n in self.lengths:
+            if n >= len(text):
+                continue
+            dropped = (len(text) - n) * DROPPED_COST
+            if best is not None and dropped >= best[0]:
+                break
+            for start in range(len(text) - n + 1):
+                found = self._best(text[start:start + n])
+                if found is not None and (best is None or found[0] + dropped < best[0]):
+                    best = found[0] + dropped, found[1]
+        return best[1] if best else None
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(packs):
+    return _Normalizer(packs)
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached(text, packs):
+    return _compile(packs)(text)
+
+
+def normalize_plate(text, packs=DEFAULT_PACKS):
+    """
+    Canonical plate for an OCR read, or None if it fits no format in packs.
+
+    Characters are only corrected towards the class their position expects:
+    a 5 in the state code becomes S, an S in the number becomes 5. Reads
+    shorter than a format's usual length are never corrected into it, so a
+    dropped character gives None rather than a different plate.
+    """
+    if not text:
+        return None
+    return _cached(text, tuple(packs))
 
 
-    return None
+def normalize_many(texts, packs=DEFAULT_PACKS):
+    """
+    normalize_plate over an iterable of reads, e.g. for backfills. Each
+    distinct read is normalized once.
+    """
+    normalizer = _compile(tuple(packs))
+    seen = {}
+    return [seen[t] if t in seen else seen.setdefault(t, normalizer(t)) for t in texts]
@@ -1,47 +1,79 @@
 import easyocr
-import cv2
-import numpy as np
+from plate_preprocess import PlatePreprocessor
+
+OCR_WIDTH, OCR_HEIGHT = 300, 100
 
 
 class LPROCR:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, preprocess="clahe"):
+        """
+        preprocess: PlatePreprocessor variant, "clahe" (default) or "threshold".
+        """
         self.reader = easyocr.Reader(['en'])
+        self.preprocessor = PlatePreprocessor(preprocess, size=(OCR_WIDTH, OCR_HEIGHT))
 
     def read_text(self, plate_crop):
-        try:
-            if plate_crop is None or plate_crop.size == 0:
-                return None
-
-            height, width = plate_crop.shape[:2]
-            if width < 50 or height < 20:
-                return None
-
-
-            resized = cv2.resize(plate_crop, (300, 100), interpolation=cv2.INTER_CUBIC)
-
-
-            gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (3, 3), 0)
+        return self.read_text_scored(plate_crop)[0]
 
+    def read_text_scored(self, plate_crop):
+        """
+        Returns (text, confidence) where confidence is the mean EasyOCR score of
+        the kept fragments, or (None, 0.0).
+        """
+        try:
+            prepared = self._preprocess(plate_crop)
+            if prepared is None:
+                return None, 0.0
 
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            enhanced = clahe.apply(gray)
+            results = self.reader.readtext(prepared, detail=1)
+            return self._combine(results)
+        except Exception as e:
+            print(f"OCR Error: {e}")
+            return None, 0.0
+
+    def read_batch(self, plate_crops):
+        """
+        Recognize several crops in one batched EasyOCR call.
+        Returns a (text, confidence) pair per crop, in input order.
+        """
+        out = [(None, 0.0)] * len(plate_crops)
+        try:
+            index = [i for i, crop in enumerate(plate_crops) if self._usable(crop)]
+            if not index:
+                return out
+
+            # every crop is preprocessed to OCR_WIDTH x OCR_HEIGHT, so they share one batch
+            prepared = self.preprocessor.process_batch([plate_crops[i] for i in index])
+            batched = self.reader.readtext_batched(list(prepared), n_width=OCR_WIDTH, n_height=OCR_HEIGHT,
+                                                   batch_size=len(index), detail=1)
+            for i, results in zip(index, batched):
+                out[i] = self._combine(results)
+        except Exception as e:
+            print(f"OCR Error: {e}")
+        return out
 
+    def _usable(self, plate_crop):
+        if plate_crop is None or plate_crop.size == 0:
+            return False
 
-            kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
-            sharpened = cv2.filter2D(enhanced, -1, kernel)
+        height, width = plate_crop.shape[:2]
+        return width >= 50 and height >= 20
 
+    def _preprocess(self, plate_crop):
+        if not self._usable(plate_crop):
+            return None
+        return self.preprocessor.process(plate_crop)
 
-            results = self.reader.readtext(sharpened, detail=1)
-            if not results:
-                return None
+    def _combine(self, results):
+        if not results:
+            return None, 0.0
 
 
-            results.sort(key=lambda x: x[0][0][1])
+        results = sorted(results, key=lambda x: x[0][0][1])
 
 
-            text = ' '.join([res[1] for res in results if res[2] > 0.2])
-            return text.strip().upper() if text else None
-        except Exception as e:
-            print(f"OCR Error: {e}")
-            return None
+        kept = [res for res in results if res[2] > 0.2]
+        text = ' '.join([res[1] for res in kept])
+        if not text.strip():
+            return None, 0.0
+        return text.strip().upper(), float(sum(res[2] for res in kept) / len(kept))
@@ -1,27 +1,44 @@
+import time
+from concurrent.futures import Future
 from db import Database
 from billing import calculate_bill, generate_invoice
+from plate_index import PlateIndex
 from vehicle_map import VEHICLE_TO_SLOT
-from datetime import datetime
 
-db = Database()
+# Batch gate writes from all threads into one commit every few ms (see Database).
+GROUP_COMMIT = False
 
-def handle_entry(plate, vehicle_type=None):
-    """
-    Reserve slot and insert parking record.
-    Returns status dict with 'slot' when success.
-    """
-    if not plate:
-        return {'status': "error", "message": "empty_plate"}
+# Move closed sessions out of the hot table after this many exits and/or
+# every this many seconds (see Archiver); None disables either trigger.
+ARCHIVE_EVERY = 500
+ARCHIVE_INTERVAL = 3600
+
+# Fuzzy matching against parked plates (see PlateIndex.nearest). 0.5 allows
+# up to two digit/letter confusions (O/0, B/8, ...) and nothing else: plates
+# that differ by a real character, or by letters like D/O or I/L, are treated
+# as different cars. Setting EXIT_MATCH_DISTANCE to 1.0 also accepts one
+# real misread at exit, at the risk of closing a similar plate's session.
+EXIT_MATCH_DISTANCE = 0.5
+ENTRY_DUPLICATE_DISTANCE = 0.5
+
+db = Database(group_commit=GROUP_COMMIT, archive_every=ARCHIVE_EVERY, archive_interval=ARCHIVE_INTERVAL)
+plate_index = PlateIndex(db)
 
 
+def _record_entry(plate, vtype):
+    # runs inside one transaction: the slot is never reserved without its parking row
     active = db.get_active_entry(plate)
     if active:
 
         return {"status": "exists", "message": "already_inside", "slot": active["slot"]}
 
-    vtype = (vehicle_type or "family_sedan").lower()
-    preferred_size = VEHICLE_TO_SLOT.get(vtype, "medium")
+    near = plate_index.nearest(plate, ENTRY_DUPLICATE_DISTANCE)
+    active = db.get_active_entry(near[0]) if near else None
+    if active:
+        return {"status": "exists", "message": "near_duplicate", "slot": active["slot"],
+                "matched_plate": near[0]}
 
+    preferred_size = VEHICLE_TO_SLOT.get(vtype, "medium")
     slot = db.find_and_reserve_slot(preferred_size, plate)
     if not slot:
 
@@ -35,6 +52,53 @@ def handle_entry(plate, vehicle_type=None):
     return {"status": "ok", "message": "entry_recorded", "slot": slot, "vehicle_type": vtype}
 
 
+def _record_exit(plate):
+    active = db.get_active_entry(plate)
+    if not active:
+        # an OCR near-miss of a parked plate still closes that plate's session
+        near = plate_index.nearest(plate, EXIT_MATCH_DISTANCE)
+        active = db.get_active_entry(near[0]) if near else None
+        if not active:
+            return None
+        plate = near[0]
+
+    entry_time = active["entry_time"]
+    # rows written before the epoch columns existed only have the text form
+    entry = active["entry_ts"] if active["entry_ts"] is not None else entry_time
+    exit_ts = int(time.time())
+    minutes, amount = calculate_bill(entry, exit_ts, active["vehicle_type"])
+    exit_time = db.close_parking_by_id(active["id"], minutes, amount, exit_ts)
+
+    released_slot = None
+    if active["slot"]:
+        released_slot = db.release_slot_by_id(active["slot"])
+
+    return {"plate": plate, "entry_time": entry_time, "exit_time": exit_time, "minutes": minutes, "amount": amount,
+            "slot_released": released_slot, "vehicle_type": active["vehicle_type"] or "family_sedan"}
+
+
+def handle_entry_async(plate, vehicle_type=None):
+    """
+    Like handle_entry, but returns a Future that resolves to the status dict
+    once the entry is durable.
+    """
+    if not plate:
+        fut = Future()
+        fut.set_result({'status': "error", "message": "empty_plate"})
+        return fut
+
+    vtype = (vehicle_type or "family_sedan").lower()
+    return db.submit(_record_entry, plate, vtype)
+
+
+def handle_entry(plate, vehicle_type=None):
+    """
+    Reserve slot and insert parking record.
+    Returns status dict with 'slot' when success.
+    """
+    return handle_entry_async(plate, vehicle_type).result()
+
+
 def handle_exit(plate):
     """
     Release slot, compute bill, update record, return invoice path & slot released.
@@ -42,22 +106,14 @@ def handle_exit(plate):
     if not plate:
         return {'status': "error", "message": "empty_plate"}
 
-    active = db.get_active_entry(plate)
-    if not active:
+    closed = db.submit(_record_exit, plate).result()
+    if not closed:
         return {"status": "not_found", "message": "no_active_entry"}
 
-    entry_time = active["entry_time"]
-    vehicle_type = active["vehicle_type"] or "family_sedan"
-    slot = active["slot"]
-
-    minutes, amount = calculate_bill(entry_time)
-    db.close_parking(plate, minutes, amount)
-
-    released_slot = None
-    if slot:
-        released_slot = db.release_slot_by_plate(plate)
-
-    exit_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    invoice_path = generate_invoice(plate, entry_time, exit_time, minutes, amount, vehicle_type)
+    vehicle_type = closed["vehicle_type"]
+    minutes, amount = closed["minutes"], closed["amount"]
+    plate = closed["plate"]
+    invoice_path = generate_invoice(plate, closed["entry_time"], closed["exit_time"], minutes, amount, vehicle_type)
     return {"status": "ok", "message": "exit_recorded", "minutes": minutes, "amount": amount,
-            "invoice": invoice_path, "slot_released": released_slot, "vehicle_type": vehicle_type}
+            "invoice": invoice_path, "slot_released": closed["slot_released"], "vehicle_type": vehicle_type,
+            "plate": plate}
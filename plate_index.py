@@ -0,0 +1,164 @@
+import threading
+
+# characters OCR mixes up, each group a digit and the letters it is read as.
+# Only a digit<->letter swap within a group costs CONFUSION_COST: letters of
+# one group (D/O/Q, I/L) can stand in the same position of two real plates.
+CONFUSION_GROUPS = ("0ODQ", "1IL", "2Z", "4A", "5S", "6G", "8B")
+CONFUSION_COST = 0.25
+
+SKELETON = str.maketrans({c: group[0] for group in CONFUSION_GROUPS for c in group[1:]})
+
+
+def skeleton(plate):
+    """
+    plate with every confusable character folded to its group's digit, so
+    plates that differ only by OCR confusions share one key. Letter swaps
+    like D/O share it too; plate_distance charges those in full.
+    """
+    return plate.translate(SKELETON)
+
+
+def plate_distance(a, b):
+    """
+    Levenshtein distance where swapping a digit for a letter it is confused
+    with (O/0, B/8, ...) costs CONFUSION_COST instead of 1. Letter<->letter
+    swaps such as D/O cost a full edit.
+    """
+    if a == b:
+        return 0.0
+    sa, sb = skeleton(a), skeleton(b)
+    prev = [float(j) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        cur = [float(i)] + [0.0] * len(b)
+        ca, ka = a[i - 1], sa[i - 1]
+        for j in range(1, len(b) + 1):
+            if ca == b[j - 1]:
+                sub = prev[j - 1]
+            elif ka == sb[j - 1] and ca.isdigit() != b[j - 1].isdigit():
+                sub = prev[j - 1] + CONFUSION_COST
+            else:
+                sub = prev[j - 1] + 1.0
+            cur[j] = min(sub, prev[j] + 1.0, cur[j - 1] + 1.0)
+        prev = cur
+    return prev[-1]
+
+
+def _deletions(key):
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+class PlateIndex:
+    """
+    In-memory index of the plates currently parked (status 'IN'), for
+    matching OCR reads that are a character or two off.
+
+    Plates are keyed by their confusion skeleton, so confusion-only misreads
+    are a dict hit. Single-character deletions of every skeleton are indexed
+    too (a SymSpell-style neighbourhood), so one real insert, delete or
+    substitution on top of any confusions is a few more dict hits. Candidates
+    are then ranked by plate_distance. nearest() returns the single closest
+    active plate within max_distance; ties return None rather than guess
+    between two cars. Thresholds of 2 or more fall back to a full scan.
+
+    The index follows the database rather than its callers: before each
+    lookup it checks PRAGMA data_version on its own connection. That value
+    changes whenever any other connection commits, including other gate
+    processes. When it does, the set of active plates is re-read and only the
+    difference is applied.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._conn = db.open_connection()
+        self._lock = threading.Lock()
+        self._version = None
+        self._active = set()
+        self._skeletons = {}   # skeleton -> active plates
+        self._deletes = {}     # skeleton minus one character -> skeletons
+
+    def _sync(self):
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        self._version = version
+        active = set(self.db.active_plates(self._conn))
+        for plate in self._active - active:
+            self._discard(plate)
+        for plate in active - self._active:
+            self._add(plate)
+
+    def _add(self, plate):
+        self._active.add(plate)
+        key = skeleton(plate)
+        plates = self._skeletons.setdefault(key, set())
+        if not plates:
+            for d in _deletions(key):
+                self._deletes.setdefault(d, set()).add(key)
+        plates.add(plate)
+
+    def _discard(self, plate):
+        self._active.discard(plate)
+        key = skeleton(plate)
+        plates = self._skeletons.get(key)
+        if plates is None:
+            return
+        plates.discard(plate)
+        if not plates:
+            del self._skeletons[key]
+            for d in _deletions(key):
+                keys = self._deletes.get(d)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._deletes[d]
+
+    def refresh(self):
+        with self._lock:
+            self._sync()
+
+    def __contains__(self, plate):
+        with self._lock:
+            self._sync()
+            return plate in self._active
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._active)
+
+    def nearest(self, plate, max_distance=1.0):
+        """
+        (active_plate, distance) for the single closest parked plate within
+        max_distance, or None if there is none or the closest is a tie.
+        """
+        if not plate:
+            return None
+        with self._lock:
+            self._sync()
+            if plate in self._active:
+                return plate, 0.0
+            if max_distance >= 2:
+                plates = set(self._active)
+            else:
+                plates = set()
+                for key in self._neighbours(skeleton(plate)):
+                    plates |= self._skeletons[key]
+
+        candidates = sorted((plate_distance(plate, p), p) for p in plates)
+        candidates = [c for c in candidates if c[0] <= max_distance]
+        if not candidates or (len(candidates) > 1 and candidates[1][0] == candidates[0][0]):
+            return None
+        d, best = candidates[0]
+        return best, d
+
+    def _neighbours(self, key):
+        # skeletons within one edit of key: same, one longer, one shorter, one substituted
+        keys = set()
+        if key in self._skeletons:
+            keys.add(key)
+        keys |= self._deletes.get(key, set())
+        for d in _deletions(key):
+            if d in self._skeletons:
+                keys.add(d)
+            keys |= self._deletes.get(d, set())
+        return keys
@@ -0,0 +1,95 @@
+import threading
+
+import cv2
+import numpy as np
+
+VARIANTS = ("clahe", "threshold")
+
+SHARPEN_KERNEL = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]], dtype=np.float32)
+
+
+class _Buffers:
+    def __init__(self, width, height):
+        self.resized = np.empty((height, width, 3), np.uint8)
+        self.gray = np.empty((height, width), np.uint8)
+        self.blur = np.empty((height, width), np.uint8)
+        self.enhanced = np.empty((height, width), np.uint8)
+        self.thresh = np.empty((height, width), np.uint8)
+        self.clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        self.batch = np.empty((0, height, width), np.uint8)
+
+
+class PlatePreprocessor:
+    """
+    Plate-crop preprocessing that allocates nothing per call: the CLAHE object,
+    sharpening kernel and every intermediate image are created once and
+    written through dst=. Buffers are per thread, so one instance can serve
+    a pool of OCR workers.
+
+    variant "clahe": resize, gray, Gaussian blur, CLAHE, sharpen (LPROCR default).
+    variant "threshold": gray, resize, bilateral filter, adaptive threshold, close.
+
+    Returned images are views into the calling thread's buffers and are only
+    valid until that thread's next call; copy them to keep them.
+    """
+
+    def __init__(self, variant="clahe", size=(300, 100)):
+        if variant not in VARIANTS:
+            raise ValueError(f"variant must be one of {VARIANTS}")
+        self.variant = variant
+        self.width, self.height = size
+        self.morph_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        self._local = threading.local()
+
+    def _buffers(self):
+        b = getattr(self._local, "buffers", None)
+        if b is None:
+            b = self._local.buffers = _Buffers(self.width, self.height)
+        return b
+
+    def process(self, crop, out=None):
+        b = self._buffers()
+        if out is None:
+            # each variant's output goes to a buffer the other variant uses internally
+            out = b.enhanced if self.variant == "threshold" else b.thresh
+        if self.variant == "clahe":
+            return self._clahe(b, crop, out)
+        return self._threshold(b, crop, out)
+
+    def process_batch(self, crops):
+        """
+        Preprocess crops into one (N, height, width) buffer; returns that array.
+        """
+        b = self._buffers()
+        if b.batch.shape[0] < len(crops):
+            b.batch = np.empty((len(crops), self.height, self.width), np.uint8)
+        batch = b.batch[:len(crops)]
+        for i, crop in enumerate(crops):
+            self.process(crop, out=batch[i])
+        return batch
+
+    def _clahe(self, b, crop, out):
+        size = (self.width, self.height)
+        if crop.ndim == 2:
+            cv2.resize(crop, size, dst=b.gray, interpolation=cv2.INTER_CUBIC)
+        else:
+            cv2.resize(crop, size, dst=b.resized, interpolation=cv2.INTER_CUBIC)
+            cv2.cvtColor(b.resized, cv2.COLOR_BGR2GRAY, dst=b.gray)
+        cv2.GaussianBlur(b.gray, (3, 3), 0, dst=b.blur)
+        b.clahe.apply(b.blur, dst=b.enhanced)
+        cv2.filter2D(b.enhanced, -1, SHARPEN_KERNEL, dst=out)
+        return out
+
+    def _threshold(self, b, crop, out):
+        size = (self.width, self.height)
+        if crop.ndim == 2:
+            cv2.resize(crop, size, dst=b.gray)
+        else:
+            # resize before the colour conversion so both land in fixed-size buffers
+            cv2.resize(crop, size, dst=b.resized)
+            cv2.cvtColor(b.resized, cv2.COLOR_BGR2GRAY, dst=b.gray)
+        cv2.bilateralFilter(b.gray, 11, 17, 17, dst=b.blur)
+        cv2.adaptiveThreshold(b.blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                              cv2.THRESH_BINARY, 11, 2, dst=b.thresh)
+        cv2.morphologyEx(b.thresh, cv2.MORPH_CLOSE, self.morph_kernel, dst=out)
+        return out
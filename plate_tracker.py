@@ -0,0 +1,205 @@
+import threading
+from collections import defaultdict
+
+
+def iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    def __init__(self, track_id, coords, frame_idx):
+        self.id = track_id
+        self.coords = coords
+        self.first_seen = frame_idx
+        self.last_seen = frame_idx
+        self.candidates = []              # [(quality, crop)] best first, not yet OCR'd
+        self.votes = defaultdict(float)   # normalized plate -> summed OCR confidence
+        self.agree = defaultdict(int)     # normalized plate -> number of reads
+        self.reads = 0
+        self.requested = 0
+        self.inflight_since = None
+        self.plate = None                 # set once the vote is stable
+        self.raw_text = None
+        self.vehicle_label = None
+        self.reported = False
+        self.expired = False
+
+    def best(self):
+        if not self.votes:
+            return None
+        return max(self.votes, key=self.votes.get)
+
+    def label(self):
+        return self.plate or self.best() or self.raw_text or ""
+
+
+class PlateTracker:
+    """
+    IoU tracker over PlateDetector boxes, so each physical plate gets a track
+    and OCR runs only a few times per track.
+
+    Each frame's crop is offered with a quality score; a track keeps its
+    buffer_size best crops and only the best one goes to OCR, once the buffer
+    is full or the track is patience frames old.
+
+    A track's plate becomes stable once min_agree reads agree, or after
+    max_reads reads (best confidence-weighted vote wins). Stable tracks are
+    never sent to OCR again. Tracks unseen for max_missed frames expire.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=15, max_reads=3, min_agree=2, ocr_timeout=15,
+                 buffer_size=3, patience=3, min_quality=20.0):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.max_reads = max_reads
+        self.min_agree = min_agree
+        self.ocr_timeout = ocr_timeout
+        self.buffer_size = buffer_size
+        self.patience = patience
+        self.min_quality = min_quality
+        self.tracks = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def update(self, boxes, frame_idx):
+        """
+        Match this frame's boxes to tracks. Returns (matched, expired):
+        matched is a list of (coords, track) in box order, expired the tracks
+        dropped for not being seen recently.
+        """
+        with self._lock:
+            pairs = []
+            for bi, box in enumerate(boxes):
+                for tid, track in self.tracks.items():
+                    score = iou(box, track.coords)
+                    if score >= self.iou_threshold:
+                        pairs.append((score, bi, tid))
+            pairs.sort(reverse=True)
+
+            assigned, used = {}, set()
+            for _, bi, tid in pairs:
+                if bi in assigned or tid in used:
+                    continue
+                assigned[bi] = tid
+                used.add(tid)
+
+            matched = []
+            for bi, box in enumerate(boxes):
+                tid = assigned.get(bi)
+                if tid is None:
+                    tid = self._next_id
+                    self._next_id += 1
+                    self.tracks[tid] = Track(tid, box, frame_idx)
+                track = self.tracks[tid]
+                track.coords = box
+                track.last_seen = frame_idx
+                matched.append((box, track))
+
+            expired = [t for t in self.tracks.values() if frame_idx - t.last_seen > self.max_missed]
+            for t in expired:
+                t.expired = True
+                del self.tracks[t.id]
+            return matched, expired
+
+    def _done(self, track):
+        return track.plate or track.reads >= self.max_reads or track.requested >= 2 * self.max_reads
+
+    def settled(self, track):
+        """
+        True once track needs no more OCR, so callers can skip its crops.
+        """
+        with self._lock:
+            return bool(self._done(track))
+
+    def offer(self, track, crop, quality):
+        """
+        Add a candidate crop for track; keeps only the buffer_size best. The
+        crop is copied only if it is kept, so it may be a view of a frame
+        that will be drawn on or reused.
+        """
+        if quality < self.min_quality:
+            return
+        with self._lock:
+            if self._done(track):
+                return
+            if len(track.candidates) >= self.buffer_size and quality <= track.candidates[-1][0]:
+                return
+            track.candidates.append((quality, crop.copy()))
+            track.candidates.sort(key=lambda c: c[0], reverse=True)
+            del track.candidates[self.buffer_size:]
+
+    def take_best(self, track, frame_idx, force=False):
+        """
+        Pop the best candidate crop if track is due for an OCR read (and mark the
+        read in flight), else None. force skips the buffer/patience wait, for
+        tracks that are about to end.
+        """
+        with self._lock:
+            if self._done(track) or not track.candidates:
+                return None
+            if track.inflight_since is not None and frame_idx - track.inflight_since <= self.ocr_timeout:
+                return None
+            ready = (len(track.candidates) >= self.buffer_size
+                     or frame_idx - track.first_seen >= self.patience)
+            if not (ready or force):
+                return None
+            track.inflight_since = frame_idx
+            track.requested += 1
+            return track.candidates.pop(0)[1]
+
+    def in_flight(self, track, frame_idx):
+        """
+        True while an OCR read requested for track may still arrive.
+        """
+        with self._lock:
+            return track.inflight_since is not None and frame_idx - track.inflight_since <= self.ocr_timeout
+
+    def cancel_read(self, track):
+        """
+        Forget the in-flight read of a crop that was dropped before OCR.
+        """
+        with self._lock:
+            track.inflight_since = None
+
+    def add_read(self, track, raw_text, plate_text, confidence):
+        """
+        Record one OCR result. Returns True when this read made the plate stable.
+        """
+        with self._lock:
+            track.inflight_since = None
+            track.reads += 1
+            if raw_text:
+                track.raw_text = raw_text
+            if plate_text:
+                track.votes[plate_text] += max(confidence, 1e-3)
+                track.agree[plate_text] += 1
+            if track.plate:
+                return False
+
+            best = track.best()
+            if best and (track.agree[best] >= self.min_agree or track.reads >= self.max_reads):
+                track.plate = best
+                return True
+            return False
+
+    def finalize(self, track):
+        """
+        Settle a track that is ending before it became stable: its best vote, if any.
+        """
+        with self._lock:
+            if not track.plate:
+                track.plate = track.best()
+            return track.plate
+
+    def flush(self):
+        with self._lock:
+            tracks = list(self.tracks.values())
+            self.tracks.clear()
+        return tracks
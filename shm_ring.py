@@ -0,0 +1,120 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Fixed ring of frame slots in one shared-memory block. Frames are copied
+    in once by the writer, and other processes read them in place as NumPy
+    views. Only slot indexes travel through the queues, never pixels.
+
+    free_q holds the indexes of unused slots. ready_q carries
+    (slot, idx, timestamp, height, width) messages for filled ones. A reader
+    takes a message, uses view(msg), then calls release(slot). When every
+    slot is taken, write() reuses the oldest frame nobody has picked up yet
+    (counted in dropped), so readers always get recent frames; with
+    drop=False it waits for a free slot instead.
+
+    The ring pickles into its Process arguments and reattaches there.
+    Frames may be smaller than shape but not larger.
+    """
+
+    def __init__(self, shape, slots=8, ctx=None):
+        ctx = ctx or mp.get_context("spawn")
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * slots)
+        self.free_q = ctx.Queue()
+        self.ready_q = ctx.Queue()
+        for slot in range(slots):
+            self.free_q.put(slot)
+        self.owner = True
+        self.dropped = 0
+        self._map()
+
+    def _map(self):
+        self.array = np.ndarray((self.slots,) + self.shape, np.uint8, buffer=self.shm.buf)
+
+    def __reduce__(self):
+        return _attach, (self.shm.name, self.shape, self.slots, self.free_q, self.ready_q)
+
+    def write(self, frame, idx, timestamp, timeout=None, drop=True):
+        """
+        Copy frame into a slot and publish it. Returns the idx of the unread
+        frame whose slot was reused, or None. Waits up to timeout seconds when
+        readers hold every slot, then raises queue.Empty.
+        """
+        h, w = frame.shape[:2]
+        if h > self.shape[0] or w > self.shape[1] or frame.shape[2:] != self.shape[2:]:
+            raise ValueError(f"frame {frame.shape} does not fit ring slots {self.shape}")
+
+        slot, reused = self._acquire(timeout, drop)
+        np.copyto(self.array[slot, :h, :w], frame)
+        self.ready_q.put((slot, idx, timestamp, h, w))
+        return reused
+
+    def _acquire(self, timeout, drop):
+        try:
+            return self.free_q.get_nowait(), None
+        except queue.Empty:
+            pass
+        # mp queues can look empty for a moment after a put, so poll both with short waits
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.free_q.get(timeout=0.01), None
+            except queue.Empty:
+                pass
+            if not drop:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise queue.Empty
+                continue
+            try:
+                msg = self.ready_q.get(timeout=0.01)
+            except queue.Empty:
+                msg = None
+            else:
+                if msg is None:
+                    # a reader's stop marker: leave it for them
+                    self.ready_q.put(None)
+                else:
+                    self.dropped += 1
+                    return msg[0], msg[1]
+            if deadline is not None and time.monotonic() >= deadline:
+                raise queue.Empty
+
+    def view(self, msg):
+        slot, _, _, h, w = msg
+        return self.array[slot, :h, :w]
+
+    def release(self, slot):
+        self.free_q.put(slot)
+
+    def stop_readers(self, n):
+        for _ in range(n):
+            self.ready_q.put(None)
+
+    def close(self):
+        """
+        Detach; the creating process also frees the block. Views into the
+        ring must not be used afterwards.
+        """
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach(name, shape, slots, free_q, ready_q):
+    ring = SharedFrameRing.__new__(SharedFrameRing)
+    ring.shape, ring.slots = shape, slots
+    ring.shm = shared_memory.SharedMemory(name=name)
+    ring.free_q, ring.ready_q = free_q, ready_q
+    ring.owner = False
+    ring.dropped = 0
+    ring._map()
+    return ring
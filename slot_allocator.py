@@ -0,0 +1,72 @@
+import threading
+from collections import deque
+
+
+class SlotAllocator:
+    """
+    In-memory free-lists of parking slots, one per slot_type.
+    The parking_slots table stays the source of truth; this is a cache
+    that can be rebuilt from it at any time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free = {}
+        self._occupied = {}
+
+    def load(self, rows):
+        """
+        Rebuild from (slot_id, slot_type, is_occupied) rows.
+        """
+        free = {}
+        occupied = {}
+        for slot_id, slot_type, is_occupied in rows:
+            free.setdefault(slot_type, deque())
+            if is_occupied:
+                occupied[slot_id] = slot_type
+            else:
+                free[slot_type].append(slot_id)
+        with self._lock:
+            self._free = free
+            self._occupied = occupied
+
+    def acquire(self, slot_type):
+        """
+        Pop a free slot of slot_type. Returns slot_id or None.
+        """
+        with self._lock:
+            q = self._free.get(slot_type)
+            if not q:
+                return None
+            slot_id = q.popleft()
+            self._occupied[slot_id] = slot_type
+            return slot_id
+
+    def claim(self, slot_id, slot_type):
+        """
+        Mark slot_id occupied, e.g. after reserving it without acquire().
+        """
+        with self._lock:
+            q = self._free.get(slot_type)
+            if q and slot_id in q:
+                q.remove(slot_id)
+            self._occupied[slot_id] = slot_type
+
+    def release(self, slot_id):
+        """
+        Return slot_id to its free-list. Unknown or already free slots are ignored.
+        """
+        with self._lock:
+            slot_type = self._occupied.pop(slot_id, None)
+            if slot_type is None:
+                return False
+            self._free.setdefault(slot_type, deque()).append(slot_id)
+            return True
+
+    def free_count(self, slot_type):
+        with self._lock:
+            return len(self._free.get(slot_type, ()))
+
+    def free_counts(self):
+        with self._lock:
+            return {slot_type: len(q) for slot_type, q in self._free.items()}
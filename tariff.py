@@ -0,0 +1,95 @@
+import time
+import numpy as np
+from vehicle_map import VEHICLE_TO_SLOT
+
+MINUTES_PER_DAY = 24 * 60
+SLOT_SIZES = ("small", "medium", "large", "xl")
+
+
+def _minute_of_day(hhmm):
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+class Tariff:
+    """
+    Parking tariff shared by the per-exit path and the batch API.
+
+    rates: per-minute base rate per slot size ("small", "medium", "large", "xl");
+        a vehicle type is mapped to its size through VEHICLE_TO_SLOT.
+    bands: [("HH:MM", "HH:MM", multiplier)] time-of-day bands on local time
+        (end may wrap past midnight); minutes outside every band use 1.0.
+    grace_minutes: sessions shorter than this are free.
+    daily_cap: maximum amount per started 24h of parking, or None.
+    minimum_minutes: minimum billed minutes.
+    utc_offset_minutes: local offset used for the bands; defaults to the host's.
+    """
+
+    def __init__(self, rates, bands=(), grace_minutes=0, daily_cap=None, minimum_minutes=1,
+                 utc_offset_minutes=None):
+        default_size = VEHICLE_TO_SLOT["default"]
+        self.rates = np.array([rates.get(size, rates[default_size]) for size in SLOT_SIZES], dtype=np.float64)
+        self._default_size = SLOT_SIZES.index(default_size)
+        self.grace_minutes = grace_minutes
+        self.daily_cap = daily_cap
+        self.minimum_minutes = minimum_minutes
+        if utc_offset_minutes is None:
+            utc_offset_minutes = time.localtime().tm_gmtoff // 60
+        self.offset_seconds = int(utc_offset_minutes) * 60
+
+        multiplier = np.ones(MINUTES_PER_DAY, dtype=np.float64)
+        for start, end, factor in bands:
+            s, e = _minute_of_day(start), _minute_of_day(end)
+            if s <= e:
+                multiplier[s:e] = factor
+            else:
+                multiplier[s:] = factor
+                multiplier[:e] = factor
+        # _cum[m] = sum of multipliers for minutes [0, m) of a day
+        self._cum = np.concatenate(([0.0], np.cumsum(multiplier)))
+        self._day_total = self._cum[-1]
+
+    def _size_of(self, vehicle_type):
+        size = VEHICLE_TO_SLOT.get(vehicle_type)
+        return SLOT_SIZES.index(size) if size else self._default_size
+
+    def _size_index(self, vehicle_types, n):
+        if vehicle_types is None or isinstance(vehicle_types, str):
+            return np.full(n, self._size_of(vehicle_types), dtype=np.intp)
+        names, inverse = np.unique(np.asarray(vehicle_types, dtype=str), return_inverse=True)
+        lookup = np.array([self._size_of(v) for v in names], dtype=np.intp)
+        return lookup[inverse.reshape(-1)]
+
+    def _units(self, minute):
+        # rate multiplier summed from local minute 0 up to (not including) minute
+        days, rem = np.divmod(minute, MINUTES_PER_DAY)
+        return days * self._day_total + self._cum[rem]
+
+    def bill_many(self, entry_ts, exit_ts, vehicle_types=None):
+        """
+        Vectorized billing. entry_ts/exit_ts are epoch-second arrays, vehicle_types
+        an array of type names (or one name for all). Returns (minutes, amounts)
+        as int64 arrays.
+        """
+        entry_ts = np.asarray(entry_ts, dtype=np.int64)
+        exit_ts = np.asarray(exit_ts, dtype=np.int64)
+        elapsed = (exit_ts - entry_ts) // 60
+        minutes = np.maximum(self.minimum_minutes, elapsed + 1)
+
+        start = (entry_ts + self.offset_seconds) // 60
+        units = self._units(start + minutes) - self._units(start)
+        amounts = self.rates[self._size_index(vehicle_types, len(entry_ts))] * units
+
+        if self.daily_cap is not None:
+            days = -(-minutes // MINUTES_PER_DAY)
+            amounts = np.minimum(amounts, days * self.daily_cap)
+        if self.grace_minutes:
+            amounts = np.where(elapsed < self.grace_minutes, 0.0, amounts)
+        return minutes, np.rint(amounts).astype(np.int64)
+
+    def bill(self, entry_ts, exit_ts, vehicle_type=None):
+        """
+        Bill one session with the same rules as bill_many. Returns (minutes, amount).
+        """
+        minutes, amounts = self.bill_many([entry_ts], [exit_ts], vehicle_type)
+        return int(minutes[0]), int(amounts[0])
@@ -0,0 +1,48 @@
+import pytest
+
+from normalize_plate import normalize_many, normalize_plate
+
+
+@pytest.mark.parametrize("raw, plate", [
+    ("MH12AB1234", "MH12AB1234"),
+    ("MH 12 AB 1234", "MH12AB1234"),
+    ("IND MH12AB1234", "MH12AB1234"),
+    ("DL3CAF5030", "DL3CAF5030"),
+    ("MH12ABC1234", "MH12ABC1234"),
+    ("22BH1234AA", "22BH1234AA"),
+])
+def test_clean_reads_are_kept(raw, plate):
+    assert normalize_plate(raw) == plate
+
+
+@pytest.mark.parametrize("raw, plate", [
+    ("MH1OAB1234", "MH10AB1234"),
+    ("KA0SMN2023", "KA05MN2023"),
+    ("MH1ZAB1234", "MH12AB1234"),
+    ("M H12A81234", "MH12AB1234"),
+    ("5H12AB1234", "SH12AB1234"),
+    ("DL3CAF5O30", "DL3CAF5030"),
+    ("228H1234AA", "22BH1234AA"),
+])
+def test_confusions_are_corrected_by_position(raw, plate):
+    assert normalize_plate(raw) == plate
+
+
+@pytest.mark.parametrize("raw", ["MH12AB123", "MH12AB12", "XX", ""])
+def test_short_reads_are_not_padded_into_plates(raw):
+    assert normalize_plate(raw) is None
+
+
+@pytest.mark.parametrize("raw", ["MH12AB1234I", "MH12AB1234 5", "MH12AB12341", "IMH12AB1234", "|MH12AB1234|x"])
+def test_stray_characters_are_dropped(raw):
+    assert normalize_plate(raw) == "MH12AB1234"
+
+
+def test_packs_are_selectable():
+    assert normalize_plate("T0125MH1234AB", packs=("temporary",)) == "T0125MH1234AB"
+    assert normalize_plate("22BH1234AA", packs=("india",)) is None
+
+
+def test_normalize_many_matches_normalize_plate():
+    reads = ["MH1OAB1234", None, "MH12AB123", "MH1OAB1234", "MH12AB1234I"]
+    assert normalize_many(reads) == [normalize_plate(r) for r in reads]
@@ -1,4 +1,7 @@
 import cv2
+from plate_preprocess import PlatePreprocessor
+
+_threshold_preprocessor = PlatePreprocessor("threshold", size=(400, 100))
 
 def draw_plate_box(frame, coords, plate_text):
     x1, y1, x2, y2 = coords
@@ -9,17 +12,37 @@ def draw_plate_box(frame, coords, plate_text):
     return frame
 
 def preprocess_plate(crop):
-
+    """
+    Threshold-variant preprocessing (see plate_preprocess.PlatePreprocessor).
+    """
     try:
-        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        return _threshold_preprocessor.process(crop).copy()
     except Exception:
         return crop
-    gray = cv2.resize(gray, (400, 100))
-    gray = cv2.bilateralFilter(gray, 11, 17, 17)
-    thresh = cv2.adaptiveThreshold(gray, 255,
-                                   cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                   cv2.THRESH_BINARY, 11, 2)
 
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-    clean = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-    return clean
+def plate_quality(crop, min_size=(50, 20), aspect_range=(1.5, 6.0)):
+    """
+    Cheap sharpness/usability score for a plate crop; higher is better, 0 means unusable.
+    Laplacian variance on a fixed-size grayscale copy, scaled down for small
+    crops and for aspect ratios that don't look like a plate.
+    """
+    if crop is None or crop.size == 0:
+        return 0.0
+    h, w = crop.shape[:2]
+    if w < min_size[0] or h < min_size[1]:
+        return 0.0
+
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    gray = cv2.resize(gray, (128, 40), interpolation=cv2.INTER_AREA)
+    sharpness = cv2.Laplacian(gray, cv2.CV_32F).var()
+
+    size_factor = min(1.0, w / 150.0)
+    aspect = w / float(h)
+    lo, hi = aspect_range
+    if aspect < lo:
+        aspect_factor = aspect / lo
+    elif aspect > hi:
+        aspect_factor = hi / aspect
+    else:
+        aspect_factor = 1.0
+    return float(sharpness * size_factor * aspect_factor)
@@ -1,20 +1,26 @@
-from ultralytics import YOLO
+from backends import load_model
+from detector import coords_of, decode_boxes
 
 class VehicleDetector:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, backend="torch", int8=False, calibration=None):
+        """
+        backend: "torch" (the .pt weights), "onnx" or "openvino"; see backends.load_model.
+        """
+        self.model = load_model(model_path, backend, int8=int8, calibration=calibration)
 
     def detect_vehicle(self, frame, conf=0.35):
         """
         Returns list of {'class_id': int, 'confidence': float, 'coords': (x1,y1,x2,y2)}
         """
-        result = self.model(frame, conf=conf, verbose=False)
-        detections = []
-        for r in result:
-            for box in r.boxes:
-                cls = int(box.cls[0].cpu().numpy()) if hasattr(box.cls[0], 'cpu') else int(box.cls[0])
-                conf_score = float(box.conf[0].cpu().numpy()) if hasattr(box.conf[0], 'cpu') else float(box.conf[0])
-                xyxy = box.xyxy[0].cpu().numpy() if hasattr(box.xyxy[0], 'cpu') else box.xyxy[0]
-                x1, y1, x2, y2 = map(int, xyxy)
-                detections.append({"class_id": cls, "confidence": conf_score, "coords": (x1, y1, x2, y2)})
-        return detections
+        return [{"class_id": int(d["class_id"]), "confidence": float(d["confidence"]), "coords": coords_of(d)}
+                for d in self.detect_batch([frame], conf=conf)[0]]
+
+    def detect_batch(self, frames, conf=0.35):
+        """
+        One forward pass over a list of frames. Returns a detector.DETECTION_DTYPE
+        array per frame.
+        """
+        if not frames:
+            return []
+        results = self.model(list(frames), conf=conf, verbose=False)
+        return [decode_boxes(r) for r in results]